@@ -1,9 +1,8 @@
 # -*- coding: utf-8 -*-
 from fastapi import APIRouter
-from sqlalchemy import text
+from fastapi.responses import JSONResponse
 
-from app.db import engine
-from app.common.utils import get_nav_cache
+from app.services.readiness import readiness
 
 router = APIRouter(prefix="", tags=["health"])
 
@@ -12,10 +11,7 @@ def healthz():
     return {"ok": True}
 
 @router.get("/readyz")
-def readyz():
-    # DB ping
-    with engine.connect() as conn:
-        conn.execute(text("SELECT 1"))
-    # nav cache
-    nav = get_nav_cache()
-    return {"ok": True, "nav_count": len(nav.get("data", []))}
+async def readyz():
+    # 只读后台检查的缓存结果（app.services.readiness），不占用连接池
+    status = readiness.status()
+    return JSONResponse(status, status_code=200 if status["ok"] else 503)
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# 运维内部端点（仅内网直连，见 app.deps.internal_only）
+from fastapi import APIRouter, Depends
+from starlette.responses import PlainTextResponse
+
+from app.db import pool_snapshot
+from app.deps import internal_only
+from app.services.metrics import render as render_metrics
+from app.services.module_loader import module_loader
+
+router = APIRouter(prefix="/internal", tags=["internal"], include_in_schema=False, dependencies=[Depends(internal_only)])
+
+@router.get("/db/pool")
+def db_pool():
+    return {"ok": True, "pools": pool_snapshot()}
+
+@router.get("/modules")
+def modules():
+    return {"modules": module_loader.info(), "pending_lazy": module_loader.pending}
+
+# Prometheus 抓取入口（不带 /internal 前缀，沿用惯例路径）
+metrics_router = APIRouter(tags=["internal"], include_in_schema=False, dependencies=[Depends(internal_only)])
+
+@metrics_router.get("/metrics")
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,6 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
-from starlette.responses import JSONResponse
-from typing import Any, Dict
+from fastapi import APIRouter, Depends, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Mapping, Tuple
+import hashlib, json
 
 # 当前用户依赖（保持与你现有的一致）
 try:
@@ -13,11 +16,17 @@ except Exception:
             return None
 
 # 统一通过 utils 的缓存来拿导航（底层由 nav_loader 聚合）
-from app.common.utils import get_nav_cache, refresh_nav_cache
+from app.common.utils import NavSnapshot, get_nav_snapshot, refresh_nav_cache
+from app.deps import require_permissions
+from app.common.http_cache import compress_variants, pick_encoding, etag_matches
+from app.services.metrics import NAV_CACHE
+from app.services.permission_registry import sync_permissions
+from app.settings import settings
+from modules.core.backend.services.rbac import get_user_permissions
 
 router = APIRouter(prefix="/api", tags=["nav"])
 
-def _shape_nav(nav: Dict[str, Any]) -> Dict[str, Any]:
+def _shape_nav(nav: Mapping[str, Any]) -> Dict[str, Any]:
     menu = nav.get("menu") or {}
     tabs = nav.get("tabs") or {}
     if not isinstance(menu, dict) or not isinstance(tabs, dict):
@@ -25,20 +34,104 @@ def _shape_nav(nav: Dict[str, Any]) -> Dict[str, Any]:
     stats = {"l1": len(menu), "tabs": sum(len(v) for v in tabs.values() if isinstance(v, list))}
     return {"menu": menu, "tabs": tabs, "stats": stats}
 
-@router.get("/nav")
-def get_nav(_: Any = Depends(current_user)) -> JSONResponse:
-    cache = get_nav_cache()
-    nav = cache.get("data") or cache  # 兼容 utils 的返回结构
+def _required_permissions(nav: Mapping[str, Any]) -> FrozenSet[str]:
+    keys = set()
+    for groups in ((nav.get("menu") or {}).values(), (nav.get("tabs") or {}).values()):
+        for items in groups:
+            keys.update(it["permission"] for it in items if it.get("permission"))
+    return frozenset(keys)
+
+def _filter_nav(nav: Mapping[str, Any], allowed: FrozenSet[str]) -> Dict[str, Any]:
+    """按权限裁剪：无 permission 的条目公开；被隐藏的 L2 连同其三级页签一起隐藏，清空的分组不输出。"""
+    visible = lambda it: not it.get("permission") or it["permission"] in allowed  # noqa: E731
+    menu: Dict[str, Any] = {}
+    hidden_bases = set()
+    for l1, items in (nav.get("menu") or {}).items():
+        kept = [it for it in items if visible(it)]
+        hidden_bases.update(it["href"] for it in items if not visible(it))
+        if kept or not items:
+            menu[l1] = kept
+    tabs: Dict[str, Any] = {}
+    for base, items in (nav.get("tabs") or {}).items():
+        if base in hidden_bases:
+            continue
+        kept = [it for it in items if visible(it)]
+        if kept or not items:
+            tabs[base] = kept
+    return {"menu": menu, "tabs": tabs}
+
+# 视图缓存：每个导航代 × 每种“相关权限集合”（用户权限 ∩ 导航用到的权限）只序列化/压缩一次；
+# 权限集合相同的用户共享同一份字节与 ETag，命中时请求期无裁剪/序列化开销。
+# 渲染是幂等的，不加锁：并发未命中最多重复渲染一次；视图表只在事件循环线程上读写
+_VIEWS: Dict[str, Any] = {"key": None, "required": frozenset(), "views": OrderedDict()}
+
+def _render_view(snap: NavSnapshot, required: FrozenSet[str], granted: FrozenSet[str]) -> Tuple[str, Dict[str, bytes]]:
+    etag_suffix = ""
+    nav: Mapping[str, Any] = snap.nav
+    if granted != required:  # 拥有全部相关权限 = 完整导航，沿用原 ETag
+        etag_suffix = "." + hashlib.sha1("\n".join(sorted(granted)).encode("utf-8")).hexdigest()[:10]
+        nav = _filter_nav(snap.nav, granted)
     shaped = _shape_nav(nav)
-    shaped["ts"] = cache.get("ts") or nav.get("ts")
-    return JSONResponse(shaped)
+    shaped["ts"] = snap.ts
+    body = json.dumps(shaped, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return f'W/"{snap.hash}{etag_suffix}"', compress_variants(body)
+
+def _nav_views(snap: NavSnapshot) -> Dict[str, Any]:
+    """当前代的视图表（事件循环线程调用）；换代时整体替换（旧视图随旧代一起丢弃）。"""
+    global _VIEWS
+    v = _VIEWS
+    if v["key"] != snap.generation:
+        fresh = {"key": snap.generation, "required": _required_permissions(snap.nav), "views": OrderedDict()}
+        if v["key"] is not None and snap.generation < v["key"]:
+            return fresh  # 线程池返回晚了的旧代：临时视图表，不覆盖新代
+        v = _VIEWS = fresh
+    return v
 
-@router.post("/nav/reload")
-def reload_nav(_: Any = Depends(current_user)) -> JSONResponse:
+async def _render_nav(snap: NavSnapshot, v: Dict[str, Any], granted: FrozenSet[str]) -> Tuple[str, Dict[str, bytes]]:
+    views = v["views"]
+    hit = views.get(granted)
+    if hit is not None:
+        NAV_CACHE.inc("hit")
+        return hit
+    NAV_CACHE.inc("miss")
+    # 序列化 + brotli/gzip 压缩放进线程池，不占事件循环
+    hit = views[granted] = await run_in_threadpool(_render_view, snap, v["required"], granted)
+    while len(views) > max(1, settings.NAV_VIEW_CACHE_SIZE):
+        views.popitem(last=False)
+    return hit
+
+@router.get("/nav")
+async def get_nav(request: Request, user: Any = Depends(current_user)) -> Response:
+    # get_nav_snapshot 可能读代号文件/快照甚至完整重建：放线程池；视图表的比较与替换回到事件循环
+    snap = await run_in_threadpool(get_nav_snapshot)
+    v = _nav_views(snap)
+    required: FrozenSet[str] = v["required"]
+    # 导航未声明任何 permission 时不查权限（所有人同一视图）
+    granted = required & await get_user_permissions(user.id) if required and user is not None else frozenset()
+    etag, variants = await _render_nav(snap, v, granted)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        NAV_CACHE.inc("not_modified")
+        return Response(status_code=304, headers=headers)
+    enc = pick_encoding(request.headers.get("accept-encoding"), variants)
+    if enc != "identity":
+        headers["Content-Encoding"] = enc
+    return Response(content=variants[enc], media_type="application/json", headers=headers)
+
+@router.post("/nav/reload", dependencies=[Depends(require_permissions(["rbac:manage"]))])
+def reload_nav() -> JSONResponse:
+    """重建导航并同步权限注册表（仅管理员）；只返回摘要，完整导航仍经 /api/nav 按权限裁剪获取。"""
     r = refresh_nav_cache()
-    nav = r.get("data") or r
-    shaped = _shape_nav(nav)
-    shaped["ok"] = r.get("ok", True)
-    shaped["ts"] = r.get("ts") or nav.get("ts")
-    shaped["errors"] = r.get("errors") or []
-    return JSONResponse(shaped)
+    out: Dict[str, Any] = {
+        "ok": r.get("ok", True),
+        "errors": r.get("errors") or [],
+        "changed": r.get("changed") or [],
+        "hash": r.get("hash"),
+        "ts": r.get("ts"),
+        "stats": _shape_nav(r)["stats"],
+    }
+    try:
+        out["permissions"] = sync_permissions()
+    except Exception as e:
+        out["permissions"] = {"ok": False, "error": str(e)}
+    return JSONResponse(out)
@@ -1,13 +1,24 @@
 # -*- coding: utf-8 -*-
 """引导脚本（容器内执行）
 - 初始化管理员账号（由宿主机 bootstrap 脚本以环境变量传入）
+- 同步各模块 permissions.register.yaml 到 permission 表
+- 按本机实测标定 bcrypt 成本（BCRYPT_ROUNDS）
 用法：
   python -m app.bootstrap init-admin --username xxx --password yyy
+  python -m app.bootstrap sync-permissions [--force]
+  python -m app.bootstrap calibrate-hash [--target-ms 250] [--write .deploy.env]
 """
-import argparse, sys
+import argparse, statistics, sys, time
+from pathlib import Path
+
+from passlib.context import CryptContext
 from sqlalchemy.orm import Session
+
+from app.settings import settings
 from app.db import SessionLocal, engine
-from modules.core.backend.models.rbac import Base as RBACBase, User, Role, Permission, UserRole, RolePermission
+from modules.core.backend.models.rbac import Base as RBACBase, User
+from modules.core.backend.services.rbac import bulk_upsert
+from app.services.permission_registry import sync_permissions
 from app.security import hash_password
 from app.common.utils import refresh_nav_cache
 
@@ -22,42 +33,60 @@ def init_admin(username: str, password: str):
             user = User(username=username, full_name="Administrator", is_active=True, password_hash=hash_password(password))
             db.add(user)
             db.flush()
-        # RBAC 基础：角色 + 权限
-        p_manage = db.query(Permission).filter(Permission.key == "rbac:manage").first()
-        if not p_manage:
-            p_manage = Permission(key="rbac:manage", name="RBAC管理")
-            db.add(p_manage)
-            db.flush()
-
-        p_view = db.query(Permission).filter(Permission.key == "nav:shell:view").first()
-        if not p_view:
-            p_view = Permission(key="nav:shell:view", name="查看壳层")
-            db.add(p_view)
-            db.flush()
-
-        role_admin = db.query(Role).filter(Role.code == "admin").first()
-        if not role_admin:
-            role_admin = Role(code="admin", name="管理员")
-            db.add(role_admin); db.flush()
-
-        # 角色绑定权限
-        for perm in (p_manage, p_view):
-            exists = db.query(RolePermission).filter(RolePermission.role_id==role_admin.id, RolePermission.permission_id==perm.id).first()
-            if not exists:
-                db.add(RolePermission(role_id=role_admin.id, permission_id=perm.id))
-
-        # 用户绑定角色
-        ru = db.query(UserRole).filter(UserRole.user_id==user.id, UserRole.role_id==role_admin.id).first()
-        if not ru:
-            db.add(UserRole(user_id=user.id, role_id=role_admin.id))
-
+        # RBAC 基础：角色 + 权限 + 授权 + 绑定（集合式幂等插入，重复执行无副作用）
+        bulk_upsert(
+            db,
+            roles=[{"code": "admin", "name": "管理员"}],
+            permissions=[{"key": "rbac:manage", "name": "RBAC管理"}, {"key": "nav:shell:view", "name": "查看壳层"}],
+            grants=[{"role_code": "admin", "permission_keys": ["rbac:manage", "nav:shell:view"]}],
+            bindings=[{"username": username, "role_code": "admin"}],
+        )
         db.commit()
         return {"ok": True, "user": username}
     finally:
         db.close()
 
+def calibrate_hash(target_ms: float = 250.0, min_rounds: int = 10, max_rounds: int = 16, samples: int = 3) -> dict:
+    """
+    逐级测 bcrypt 校验耗时（每级取 samples 次中位数），选不超过 target_ms 的最高成本；
+    最低不低于 min_rounds（即便超预算也以安全下限为准）。
+    """
+    measured = {}
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        ctx = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=rounds)
+        h = ctx.hash("calibrate-hash")
+        times = []
+        for _ in range(samples):
+            t0 = time.perf_counter()
+            ctx.verify("calibrate-hash", h)
+            times.append((time.perf_counter() - t0) * 1000)
+        ms = statistics.median(times)
+        measured[rounds] = round(ms, 1)
+        if ms > target_ms:
+            break
+        chosen = rounds
+    return {"rounds": chosen, "target_ms": target_ms, "verify_ms": measured, "current": settings.BCRYPT_ROUNDS}
+
+def _write_env(path: str, key: str, value: str) -> None:
+    """替换或追加 KEY=VALUE（保留其它行）。"""
+    p = Path(path)
+    lines = p.read_text(encoding="utf-8").splitlines() if p.exists() else []
+    out, done = [], False
+    for line in lines:
+        if line.startswith(f"{key}="):
+            if not done:
+                out.append(f"{key}={value}")
+                done = True
+            continue
+        out.append(line)
+    if not done:
+        out.append(f"{key}={value}")
+    p.write_text("\n".join(out) + "\n", encoding="utf-8")
+
 def refresh_nav():
-    return refresh_nav_cache()
+    # 命令行单进程重建：允许大体量 register 走进程池并行解析
+    return refresh_nav_cache(parallel=True)
 
 def main(argv=None):
     parser = argparse.ArgumentParser(description="minipost bootstrap tool")
@@ -69,6 +98,15 @@ def main(argv=None):
 
     p2 = sub.add_parser("refresh-nav")
 
+    p3 = sub.add_parser("sync-permissions")
+    p3.add_argument("--force", action="store_true", help="忽略同步标记，强制比对写入")
+
+    p4 = sub.add_parser("calibrate-hash")
+    p4.add_argument("--target-ms", type=float, default=250.0, help="单次口令校验的目标耗时（毫秒）")
+    p4.add_argument("--min-rounds", type=int, default=10)
+    p4.add_argument("--max-rounds", type=int, default=16)
+    p4.add_argument("--write", metavar="ENV_FILE", help="把 BCRYPT_ROUNDS 写入该 env 文件（如 .deploy.env）")
+
     args = parser.parse_args(argv)
     if args.cmd == "init-admin":
         print(init_admin(args.username, args.password))
@@ -76,6 +114,17 @@ def main(argv=None):
     elif args.cmd == "refresh-nav":
         print(refresh_nav())
         return 0
+    elif args.cmd == "sync-permissions":
+        print(sync_permissions(force=args.force))
+        return 0
+    elif args.cmd == "calibrate-hash":
+        r = calibrate_hash(args.target_ms, args.min_rounds, args.max_rounds)
+        print(r)
+        if args.write:
+            _write_env(args.write, "BCRYPT_ROUNDS", str(r["rounds"]))
+        # 末行便于部署脚本直接捕获；存量用户在下次登录时按新成本透明重算
+        print(f"BCRYPT_ROUNDS={r['rounds']}")
+        return 0
     else:
         parser.print_help()
         return 1
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+连接池：可配置 + 可观测
+
+- TimedQueuePool / TimedAsyncQueuePool：在取连接处计时（等待时长、超时次数）
+- PoolStats：checkout/checkin/connect/invalidate 计数 + 等待时长汇总；snapshot() 附带池的实时占用
+- pre-ping 策略：always（SQLAlchemy 自带，每次 checkout 一次往返）/ idle（空闲超过 N 秒才 ping）/ never
+"""
+from __future__ import annotations
+import threading, time
+from typing import Any, Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+class PoolStats:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.pings = 0
+        self.ping_failures = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.pool: Any = None
+
+    def record_wait(self, seconds: float, timed_out: bool) -> None:
+        with self._lock:
+            self.wait_total += seconds
+            if seconds > self.wait_max:
+                self.wait_max = seconds
+            if timed_out:
+                self.timeouts += 1
+
+    def incr(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "soft_invalidations": self.soft_invalidations,
+                "pings": self.pings,
+                "ping_failures": self.ping_failures,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_total, 6),
+                "wait_seconds_max": round(self.wait_max, 6),
+                "wait_seconds_avg": round(self.wait_total / self.checkouts, 6) if self.checkouts else 0.0,
+            }
+        pool = self.pool
+        if pool is not None:
+            out.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+            })
+        return out
+
+class _TimedMixin:
+    _stats: PoolStats
+
+    def _do_get(self):  # type: ignore[override]
+        t0 = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()  # type: ignore[misc]
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self._stats.record_wait(time.perf_counter() - t0, timed_out)
+
+    def recreate(self):  # type: ignore[override]
+        new = super().recreate()  # type: ignore[misc]
+        new._stats = self._stats
+        self._stats.pool = new
+        return new
+
+class TimedQueuePool(_TimedMixin, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedMixin, AsyncAdaptedQueuePool):
+    pass
+
+def instrument_engine(sync_engine: Any, stats: PoolStats, pre_ping: str, idle_seconds: float) -> None:
+    """挂池事件；sync_engine 对异步引擎传 async_engine.sync_engine。"""
+    pool = sync_engine.pool
+    pool._stats = stats
+    stats.pool = pool
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(_dbapi_conn, _rec):
+        stats.incr("connects")
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_conn, rec, _proxy):
+        stats.incr("checkouts")
+        if pre_ping != "idle":
+            return
+        last = rec.info.get("last_checkin")
+        if last is None or time.monotonic() - last < idle_seconds:
+            return
+        stats.incr("pings")
+        cursor = dbapi_conn.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception:
+            stats.incr("ping_failures")
+            # 交给连接池丢弃并重连（最多重试池内连接数次）
+            raise exc.DisconnectionError()
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(_dbapi_conn, rec):
+        stats.incr("checkins")
+        rec.info["last_checkin"] = time.monotonic()
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _on_invalidate(_dbapi_conn, _rec, _exc):
+        stats.incr("invalidations")
+
+    @event.listens_for(sync_engine, "soft_invalidate")
+    def _on_soft_invalidate(_dbapi_conn, _rec, _exc):
+        stats.incr("soft_invalidations")
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP 缓存/协商小工具（无状态）
+- 预压缩：对一份字节内容生成 identity/gzip/br 变体（br 依赖可选的 brotli 包）
+- 协商：按 Accept-Encoding 选取已有变体
+- 条件请求：If-None-Match 与 ETag 的弱比较
+"""
+from __future__ import annotations
+import gzip
+from typing import Dict, Optional
+
+try:
+    import brotli  # type: ignore
+except Exception:  # pragma: no cover - 可选依赖
+    brotli = None
+
+# 协商优先级：br > gzip > identity
+_PREFERRED = ("br", "gzip")
+
+def compress_variants(body: bytes, min_size: int = 256) -> Dict[str, bytes]:
+    """返回 {encoding: bytes}；identity 总是存在，过小的内容不压缩。"""
+    out: Dict[str, bytes] = {"identity": body}
+    if len(body) < min_size:
+        return out
+    gz = gzip.compress(body, compresslevel=9, mtime=0)
+    if len(gz) < len(body):
+        out["gzip"] = gz
+    if brotli is not None:
+        br = brotli.compress(body, quality=11)
+        if len(br) < len(body):
+            out["br"] = br
+    return out
+
+def pick_encoding(accept_encoding: Optional[str], available) -> str:
+    """按 Accept-Encoding 选择编码（忽略 q=0），没有可用变体时回落 identity。"""
+    if not accept_encoding:
+        return "identity"
+    accepted = set()
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        q = params.replace(" ", "").lower()
+        if q.startswith("q=") and q[2:] in ("0", "0.0", "0.00", "0.000"):
+            continue
+        if token:
+            accepted.add(token)
+    for enc in _PREFERRED:
+        if enc in available and (enc in accepted or "*" in accepted):
+            return enc
+    return "identity"
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 弱比较（W/ 前缀忽略），支持 * 与逗号列表。"""
+    if not if_none_match:
+        return False
+    target = etag[2:] if etag.startswith("W/") else etag
+    for cand in if_none_match.split(","):
+        cand = cand.strip()
+        if cand == "*":
+            return True
+        if cand.startswith("W/"):
+            cand = cand[2:]
+        if cand == target:
+            return True
+    return False
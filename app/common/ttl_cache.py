@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""有界 TTL + LRU 缓存（线程安全，进程内）。ttl<=0 或 maxsize<=0 时等同关闭。"""
+from __future__ import annotations
+import threading, time
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+class TTLCache(Generic[V]):
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires, value = item
+            if expires <= now:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        """ttl 可按条目缩短（例如不超过 token 的 exp），但不会超过全局 ttl。"""
+        if not self.enabled:
+            return
+        life = self.ttl if ttl is None else min(ttl, self.ttl)
+        if life <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + life, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def discard_where(self, pred: Callable[[Hashable, Any], bool]) -> int:
+        with self._lock:
+            keys = [k for k, (_, v) in self._data.items() if pred(k, v)]
+            for k in keys:
+                del self._data[k]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
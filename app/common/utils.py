@@ -2,45 +2,145 @@
 """
 统一导航聚合（唯一事实源）：使用 app.services.nav_loader.rebuild_nav
 原先这里的“树形菜单校验(level/children/...)”已废弃，改为 menu.register.yaml + tabs.register.yaml。
+
+进程内缓存为不可变快照（NavSnapshot），发布时整体替换引用：
+- 读：get_nav_snapshot()/get_nav_cache() 无锁、无拷贝，同一请求内拿到的是同一代
+- 写：publish_nav() 只在重建成功后替换；重建失败保留上一代
+- 跨 worker：refresh_nav_cache() 成功后替换共享目录下的代号文件（nav.generation）；
+  其它 worker 在读取时每 NAV_SYNC_SECONDS 秒最多 stat 一次，发现变化即加载共享快照
 """
-import time, threading
-from typing import Dict, Any
-from app.services.nav_loader import rebuild_nav
-
-# 进程内缓存
-_NAV_CACHE: Dict[str, Any] = {'ts': 0.0, 'data': {}}
-_NAV_LOCK = threading.Lock()
-
-def get_nav_cache() -> Dict[str, Any]:
-    """返回 nav_loader 的结构（含 ts），前端主要消费 menu/tabs。"""
-    with _NAV_LOCK:
-        nav = _NAV_CACHE['data'] or {
-            "menu": {}, "tabs": {}, "generated_at": None, "hash": "0"*16,
-            "stats": {"modules": 0, "menus": 0, "tabs": 0}
-        }
-        # 兼容：附带 ts，便于排障
-        return {"ts": _NAV_CACHE['ts'], **nav}
-
-def refresh_nav_cache() -> Dict[str, Any]:
+import os, time, tempfile, threading, logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional, Tuple
+from app.settings import settings
+from app.services.nav_loader import rebuild_nav, load_nav, cache_dir
+
+logger = logging.getLogger("minipost")
+
+def _empty_nav() -> Dict[str, Any]:
+    return {
+        "menu": {}, "tabs": {}, "routes": {}, "generated_at": None, "hash": "0"*16,
+        "stats": {"modules": 0, "menus": 0, "tabs": 0}
+    }
+
+@dataclass(frozen=True)
+class NavSnapshot:
+    """一代导航：nav 为只读视图（含 ts），内部 menu/tabs/routes 由调用方约定不修改。"""
+    generation: int
+    ts: float
+    nav: Mapping[str, Any] = field(repr=False)
+
+    @property
+    def hash(self) -> str:
+        return self.nav.get("hash") or "0"*16
+
+    @property
+    def menu(self) -> Mapping[str, Any]:
+        return self.nav.get("menu") or {}
+
+    @property
+    def tabs(self) -> Mapping[str, Any]:
+        return self.nav.get("tabs") or {}
+
+    @property
+    def routes(self) -> Mapping[str, str]:
+        return self.nav.get("routes") or {}
+
+def _make_snapshot(generation: int, nav: Dict[str, Any], ts: float) -> NavSnapshot:
+    # 兼容：附带 ts，便于排障
+    return NavSnapshot(generation=generation, ts=ts, nav=MappingProxyType({"ts": ts, **nav}))
+
+# 进程内缓存：只做引用替换（赋值在 CPython 下原子），写入方串行
+_NAV_SNAPSHOT: NavSnapshot = _make_snapshot(0, _empty_nav(), 0.0)
+_PUBLISH_LOCK = threading.Lock()
+
+# 跨 worker 同步状态：下次检查时间（monotonic）+ 已见过的代号文件 stat 戳
+_SYNC_STATE: Dict[str, Any] = {"next_check": 0.0, "stamp": None}
+_SYNC_LOCK = threading.Lock()
+
+def _generation_path() -> Path:
+    return cache_dir() / "nav.generation"
+
+def _generation_stamp() -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(_generation_path())
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+def _bump_generation(snap: NavSnapshot) -> None:
+    """原子替换代号文件（新 inode），通知其它 worker 重新加载共享快照。"""
+    path = _generation_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".gen.", suffix=".tmp", dir=str(path.parent))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(f"{time.time_ns()} {snap.hash}\n")
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("导航代号文件写入失败（%s）：%s", path, e)
+        return
+    _SYNC_STATE["stamp"] = _generation_stamp()
+
+def _maybe_sync() -> None:
+    """读路径上的廉价检查：未到间隔直接返回；同一时刻只有一个线程去同步，其余线程不等待。"""
+    interval = settings.NAV_SYNC_SECONDS
+    if interval <= 0:
+        return
+    now = time.monotonic()
+    if now < _SYNC_STATE["next_check"]:
+        return
+    if not _SYNC_LOCK.acquire(blocking=False):
+        return
+    try:
+        _SYNC_STATE["next_check"] = now + interval
+        stamp = _generation_stamp()
+        if stamp is None or stamp == _SYNC_STATE["stamp"]:
+            return
+        snap = publish_nav(load_nav(write_cache=True))
+        # 发布成功后才记为已见；加载失败（快照半写/YAML 编辑中）下个间隔重试
+        _SYNC_STATE["stamp"] = stamp
+        logger.info("导航已同步至其它 worker 发布的新一代：hash=%s", snap.hash)
+    except Exception as e:
+        logger.warning("导航跨 worker 同步失败：%s", e)
+    finally:
+        _SYNC_LOCK.release()
+
+def get_nav_snapshot() -> NavSnapshot:
+    """当前已发布的导航代（无锁；按间隔顺带检查其它 worker 的发布）。"""
+    _maybe_sync()
+    return _NAV_SNAPSHOT
+
+def get_nav_cache() -> Mapping[str, Any]:
+    """返回 nav_loader 的结构（含 ts）的只读视图，前端主要消费 menu/tabs。"""
+    return get_nav_snapshot().nav
+
+def publish_nav(nav: Dict[str, Any]) -> NavSnapshot:
+    """把一份聚合结果发布为新的一代（仅本进程）。"""
+    global _NAV_SNAPSHOT
+    with _PUBLISH_LOCK:
+        snap = _make_snapshot(_NAV_SNAPSHOT.generation + 1, nav, time.time())
+        _NAV_SNAPSHOT = snap
+        if _SYNC_STATE["stamp"] is None:
+            # 首次发布（启动预热）：以当前代号文件为基线，避免随后立即重复加载
+            _SYNC_STATE["stamp"] = _generation_stamp()
+    return snap
+
+def refresh_nav_cache(parallel: bool = False) -> Dict[str, Any]:
     """
     重建聚合缓存；保持与脚本预期相容（返回 ok/errors/统计），
     但不再做旧版 level/children 树形校验。
+    重建失败时不发布，返回上一代内容与错误信息。
     """
-    ok = True
-    errors = []
     try:
-        nav = rebuild_nav(write_cache=True)  # 统一新版 Schema 校验与聚合
+        nav = rebuild_nav(write_cache=True, parallel=parallel)  # 统一新版 Schema 校验与聚合
     except Exception as e:
-        ok = False
-        nav = {
-            "menu": {}, "tabs": {}, "generated_at": None, "hash": "0"*16,
-            "stats": {"modules": 0, "menus": 0, "tabs": 0}
-        }
-        errors = [str(e)]
-
-    with _NAV_LOCK:
-        _NAV_CACHE['ts'] = time.time()
-        _NAV_CACHE['data'] = nav
+        return {"ok": False, "errors": [str(e)], **get_nav_cache()}
 
+    snap = publish_nav(nav)
+    _bump_generation(snap)
     # 兼容 bootstrap 的“校验输出窗口”
-    return {"ok": ok, "errors": errors, **nav}
+    return {"ok": True, "errors": [], **snap.nav}
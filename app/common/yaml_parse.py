@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+YAML 解析（register 文件）
+- 优先 libyaml 的 CSafeLoader（C 实现），未编译 libyaml 时回落纯 Python SafeLoader
+- 模块只依赖 yaml：nav_loader 的进程池（spawn）子进程只导入这里，启动快
+"""
+from __future__ import annotations
+import time
+from typing import Any, Tuple
+
+import yaml
+
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+def parse_yaml(raw: bytes) -> Any:
+    data = yaml.load(raw.decode("utf-8"), Loader=SafeLoader)
+    return data if data is not None else {}
+
+def parse_timed(raw: bytes) -> Tuple[bool, Any, float]:
+    """(成功?, data 或错误信息, 耗时秒)；错误转成字符串，避免异常对象跨进程序列化失败。"""
+    t0 = time.perf_counter()
+    try:
+        return True, parse_yaml(raw), time.perf_counter() - t0
+    except Exception as e:
+        return False, f"{type(e).__name__}: {e}", time.perf_counter() - t0
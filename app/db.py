@@ -1,20 +1,65 @@
 # -*- coding: utf-8 -*-
-"""数据库初始化（PostgreSQL）"""
+"""数据库初始化（PostgreSQL）
+
+- 同步：engine / SessionLocal / get_db（psycopg2），现有代码照常使用
+- 异步（可选，DB_ASYNC=true）：async_engine / AsyncSessionLocal（asyncpg 或 psycopg3）
+- 连接池参数、pre-ping 策略、每连接 application_name/statement_timeout 均来自 Settings（DB_*），
+  池指标见 pool_stats / async_pool_stats（/internal/db/pool）
+- get_async_db：热路径统一用它。开启异步时给出真正的 AsyncSession；
+  未开启时给出 ThreadedSession（同步 Session 放进线程池执行，接口同 AsyncSession 子集），
+  调用方无需分支
+"""
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 from app.settings import settings
+from app.common.db_pool import PoolStats, TimedQueuePool, TimedAsyncQueuePool, instrument_engine
 
 # 仅支持 Postgres
-def _dsn() -> str:
+def _dsn(driver: str = "psycopg2") -> str:
     return (
-        f"postgresql+psycopg2://{settings.PG_USER}:{settings.PG_PASSWORD}"
+        f"postgresql+{driver}://{settings.PG_USER}:{settings.PG_PASSWORD}"
         f"@{settings.PG_HOST}:{settings.PG_PORT}/{settings.PG_DB}"
     )
 
-engine = create_engine(_dsn(), pool_pre_ping=True, pool_size=5, max_overflow=5, future=True)
+def _pool_kwargs() -> Dict[str, Any]:
+    return dict(
+        pool_pre_ping=(settings.DB_PRE_PING == "always"),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+
+def _connect_args(driver: str) -> Dict[str, Any]:
+    """每连接会话参数：application_name / statement_timeout（毫秒，0 不设置）。"""
+    app_name = settings.DB_APPLICATION_NAME
+    timeout_ms = settings.DB_STATEMENT_TIMEOUT_MS
+    if driver == "asyncpg":
+        server_settings: Dict[str, str] = {}
+        if app_name:
+            server_settings["application_name"] = app_name
+        if timeout_ms > 0:
+            server_settings["statement_timeout"] = str(timeout_ms)
+        return {"server_settings": server_settings} if server_settings else {}
+    args: Dict[str, Any] = {}
+    if app_name:
+        args["application_name"] = app_name
+    if timeout_ms > 0:
+        args["options"] = f"-c statement_timeout={timeout_ms}"
+    return args
+
+pool_stats = PoolStats("sync")
+engine = create_engine(
+    _dsn(), poolclass=TimedQueuePool, connect_args=_connect_args("psycopg2"), future=True, **_pool_kwargs(),
+)
+instrument_engine(engine, pool_stats, settings.DB_PRE_PING, settings.DB_PRE_PING_IDLE_SECONDS)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
 def get_db():
+    # 内置路由已改用 get_async_db；保留给仍用同步 Session 的模块路由（Depends(get_db)）
     from sqlalchemy.exc import OperationalError
     db = SessionLocal()
     try:
@@ -23,3 +68,64 @@ def get_db():
         raise
     finally:
         db.close()
+
+# ---- 异步引擎（可选）----
+async_engine = None
+AsyncSessionLocal = None
+async_pool_stats: Optional[PoolStats] = None
+if settings.DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_pool_stats = PoolStats("async")
+    async_engine = create_async_engine(
+        _dsn(settings.PG_ASYNC_DRIVER), poolclass=TimedAsyncQueuePool,
+        connect_args=_connect_args(settings.PG_ASYNC_DRIVER), **_pool_kwargs(),
+    )
+    instrument_engine(async_engine.sync_engine, async_pool_stats, settings.DB_PRE_PING, settings.DB_PRE_PING_IDLE_SECONDS)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+class ThreadedSession:
+    """
+    未开启 DB_ASYNC 时的替身：与 AsyncSession 同名的 await 接口，底层同步 Session 在线程池执行。
+    与 AsyncSessionLocal 一致 expire_on_commit=False：commit 后读属性不会在事件循环线程上懒加载查库。
+    """
+
+    def __init__(self, session: Optional[Session] = None):
+        self.sync_session = session or SessionLocal(expire_on_commit=False)
+
+    async def execute(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def run_sync(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+    async def __aenter__(self) -> "ThreadedSession":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+def async_session():
+    """`async with async_session() as db:`，按配置返回 AsyncSession 或 ThreadedSession。"""
+    if AsyncSessionLocal is not None:
+        return AsyncSessionLocal()
+    return ThreadedSession()
+
+async def get_async_db() -> AsyncIterator[Any]:
+    async with async_session() as db:
+        yield db
+
+def pool_snapshot() -> Dict[str, Any]:
+    out = {"sync": pool_stats.snapshot()}
+    if async_pool_stats is not None:
+        out["async"] = async_pool_stats.snapshot()
+    return out
@@ -1,35 +1,88 @@
 # -*- coding: utf-8 -*-
 from fastapi import Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
+import ipaddress
 
-from app.db import get_db
-from app.security import decode_access_token
-from modules.core.backend.models.rbac import User, Role, Permission, UserRole, RolePermission
+from app.settings import settings
+from app.security import decode_access_claims, refresh_access_token, refresh_due
+from app.services.auth_cache import AuthUser, get_active_user
+from modules.core.backend.services.rbac import get_user_permissions
 
-def current_user(request: Request, db: Session = Depends(get_db)) -> User:
-    token = request.cookies.get("access_token") or request.headers.get("Authorization", "").replace("Bearer ", "")
+async def current_user(request: Request) -> AuthUser:
+    cookie_token = request.cookies.get("access_token")
+    token = cookie_token or request.headers.get("Authorization", "").replace("Bearer ", "")
     if not token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="未登录")
-    sub = decode_access_token(token)
-    user = db.query(User).filter(User.username == sub, User.is_active == True).first()
+    claims = decode_access_claims(token)  # 已验签 token 走进程内缓存
+    sub = claims.get("sub") or ""
+    # 临近过期的 Cookie 会话：续签并由 SessionRefreshMiddleware 回写 Cookie
+    refresh = bool(cookie_token) and refresh_due(claims)
+    # token-claims 模式：身份完全取自已验签的 JWT，热路径不查库（停用用户要等 token 过期才失效；
+    # 续期前仍按库确认用户可用，避免停用用户被无限续期）
+    if settings.AUTH_TOKEN_CLAIMS and sub and isinstance(claims.get("uid"), int) and not refresh:
+        return AuthUser(id=claims["uid"], username=sub)
+    user = await get_active_user(sub)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="用户不可用")
+    if refresh:
+        request.state.access_token = refresh_access_token(token, claims)
     return user
 
 def require_permissions(perms: List[str]):
-    def _inner(user: User = Depends(current_user), db: Session = Depends(get_db)) -> User:
-        # 汇总用户所有权限
-        q = (
-            db.query(Permission.key)
-            .join(RolePermission, RolePermission.permission_id == Permission.id)
-            .join(UserRole, UserRole.role_id == RolePermission.role_id)
-            .filter(UserRole.user_id == user.id)
-        )
-        user_perm_keys = {r[0] for r in q.all()}
-        missing = [p for p in perms if p not in user_perm_keys]
-        if missing:
+    required = frozenset(perms)
+
+    async def _inner(user: AuthUser = Depends(current_user)) -> AuthUser:
+        # 汇总用户所有权限（按 RBAC 代号缓存，命中时不查库）
+        user_perm_keys = await get_user_permissions(user.id)
+        if not required <= user_perm_keys:
+            missing = [p for p in perms if p not in user_perm_keys]
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"缺少权限: {missing}")
         return user
 
     return _inner
+
+@lru_cache(maxsize=1)
+def _internal_networks(spec: str) -> Tuple[ipaddress._BaseNetwork, ...]:
+    return tuple(ipaddress.ip_network(x.strip(), strict=False) for x in spec.split(",") if x.strip())
+
+def _trusted(host: str) -> bool:
+    try:
+        addr = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(addr in net for net in _internal_networks(settings.TRUSTED_PROXIES))
+
+def client_ip(request: Request) -> str:
+    """
+    真实客户端 IP：对端是受信反代（TRUSTED_PROXIES）时，X-Forwarded-For 从右向左跳过受信反代取第一个地址，
+    没有该头再看 X-Real-IP；对端不受信时转发头一律忽略（可被客户端伪造）。
+    """
+    peer = request.client.host if request.client else ""
+    if not _trusted(peer):
+        return peer
+    hops = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+    for hop in reversed(hops):
+        if not _trusted(hop):
+            return hop if _is_ip(hop) else peer
+    real = request.headers.get("x-real-ip", "").strip()
+    if real and _is_ip(real):
+        return real
+    return hops[0] if hops and _is_ip(hops[0]) else peer
+
+def _is_ip(value: str) -> bool:
+    try:
+        ipaddress.ip_address(value)
+    except ValueError:
+        return False
+    return True
+
+def internal_only(request: Request) -> None:
+    """/internal/* 运维端点：仅允许 INTERNAL_ALLOW 网段直连（反代层另行屏蔽）。"""
+    host = request.client.host if request.client else ""
+    try:
+        addr = ipaddress.ip_address(host)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="仅限内部访问")
+    if not any(addr in net for net in _internal_networks(settings.INTERNAL_ALLOW)):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="仅限内部访问")
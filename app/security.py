@@ -1,33 +1,139 @@
 # -*- coding: utf-8 -*-
 # 登录/鉴权：JWT + Cookie（HTTPOnly）
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+import time
+from typing import Optional, Dict, Any, Tuple
 
 import jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
+from starlette.responses import Response
 
 from app.settings import settings
+from app.common.ttl_cache import TTLCache
+from app.services.metrics import PASSWORD_VERIFY_SECONDS
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt 成本固定为 BCRYPT_ROUNDS（由 python -m app.bootstrap calibrate-hash 按本机测得）；
+# min=max=default，其它成本的存量哈希 needs_update 为真，登录成功时透明重算
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    t0 = time.perf_counter()
+    try:
+        return pwd_context.verify(plain, hashed)
+    finally:
+        PASSWORD_VERIFY_SECONDS.observe(time.perf_counter() - t0)
+
+def verify_and_update(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """校验口令；成本与当前配置不符时一并返回按新成本重算的哈希（否则 None）。"""
+    t0 = time.perf_counter()
+    try:
+        return pwd_context.verify_and_update(plain, hashed)
+    finally:
+        PASSWORD_VERIFY_SECONDS.observe(time.perf_counter() - t0)
+
+# 已验签 token 缓存：token → claims；条目寿命不超过 exp，也不超过 TOKEN_CACHE_TTL
+_TOKENS: TTLCache[Dict[str, Any]] = TTLCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL)
+# 滑动续期：旧 token → 新 token（同一 token 的并发请求只签发一次）
+_REFRESHED: TTLCache[str] = TTLCache(settings.TOKEN_CACHE_SIZE, 60.0)
 
-def create_access_token(sub: str, expires_minutes: Optional[int] = None) -> str:
+def create_access_token(sub: str, expires_minutes: Optional[int] = None, claims: Optional[Dict[str, Any]] = None) -> str:
     expire = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes or settings.JWT_EXPIRES_MINUTES)
-    payload = {"sub": sub, "exp": expire}
+    payload = {"auth_time": int(time.time()), **(claims or {}), "sub": sub, "exp": expire}
     token = jwt.encode(payload, settings.JWT_SECRET, algorithm="HS256")
     return token
 
-def decode_access_token(token: str) -> str:
+def decode_access_claims(token: str) -> Dict[str, Any]:
+    """验签并返回 claims（只读约定）；同一 token 在缓存期内不重复验签。"""
+    claims = _TOKENS.get(token)
+    if claims is not None:
+        return claims
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])  # returns dict
-        return payload.get("sub") or ""
+        claims = jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])  # returns dict
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token 已过期")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="无效 Token")
+    exp = claims.get("exp")
+    if isinstance(exp, (int, float)):
+        _TOKENS.set(token, claims, ttl=exp - time.time())
+    return claims
+
+def decode_access_token(token: str) -> str:
+    return decode_access_claims(token).get("sub") or ""
+
+# ---- 滑动续期 ----
+def refresh_due(claims: Dict[str, Any]) -> bool:
+    """剩余有效期不足 JWT_REFRESH_WITHIN_MINUTES 且未超过会话上限 JWT_MAX_SESSION_HOURS。"""
+    # 窗口不超过有效期的一半，避免新签的 token 立刻又到期续签
+    window = min(settings.JWT_REFRESH_WITHIN_MINUTES, settings.JWT_EXPIRES_MINUTES / 2) * 60
+    exp = claims.get("exp")
+    if window <= 0 or not isinstance(exp, (int, float)):
+        return False
+    now = time.time()
+    if exp - now > window:
+        return False
+    # 无 auth_time 的旧 token 退回 iat；两者都没有则无法判定会话起点，不续签（到期后重新登录），
+    # 否则续签出的 token 以当前时间为 auth_time，会话上限被重置
+    auth_time = claims.get("auth_time", claims.get("iat"))
+    if not isinstance(auth_time, (int, float)):
+        return False
+    limit = settings.JWT_MAX_SESSION_HOURS * 3600
+    if limit > 0 and now - auth_time + settings.JWT_EXPIRES_MINUTES * 60 > limit:
+        return False
+    return True
+
+def refresh_access_token(token: str, claims: Dict[str, Any]) -> str:
+    """按原 claims（保留 auth_time）重新签发；调用方先确认 refresh_due 与用户仍可用。"""
+    new = _REFRESHED.get(token)
+    if new is None:
+        extra = {k: v for k, v in claims.items() if k not in ("sub", "exp", "iat", "nbf")}
+        if "auth_time" not in extra and isinstance(claims.get("iat"), (int, float)):
+            extra["auth_time"] = int(claims["iat"])  # 旧 token：会话起点沿用 iat
+        new = create_access_token(claims.get("sub") or "", claims=extra)
+        _REFRESHED.set(token, new)
+    return new
+
+def set_access_cookie(resp: Response, token: str) -> None:
+    # Cookie 属性：HttpOnly，Lax，路径根；开发环境未强制 secure；寿命与 JWT_EXPIRES_MINUTES 一致
+    resp.set_cookie(
+        key="access_token",
+        value=token,
+        httponly=True,
+        samesite="lax",
+        secure=False,
+        max_age=settings.JWT_EXPIRES_MINUTES * 60,
+        path="/",
+    )
+
+class SessionRefreshMiddleware:
+    """纯 ASGI：current_user 判定需要续期时（request.state.access_token），在响应头追加新 Cookie。"""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def _send(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                token = (scope.get("state") or {}).get("access_token")
+                if token:
+                    holder = Response()
+                    set_access_cookie(holder, token)
+                    cookie = [h for h in holder.raw_headers if h[0] == b"set-cookie"]
+                    message = {**message, "headers": list(message.get("headers") or []) + cookie}
+            await send(message)
+
+        await self.app(scope, receive, _send)
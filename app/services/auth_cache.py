@@ -0,0 +1,94 @@
+# app/services/auth_cache.py
+# -*- coding: utf-8 -*-
+"""
+登录用户缓存（current_user 热路径）
+
+- 以 JWT sub（用户名）为键缓存“活跃用户”的轻量身份 AuthUser（不缓存 ORM 对象，不跨会话）
+- 有界 TTL/LRU：AUTH_CACHE_TTL 秒 / AUTH_CACHE_SIZE 条；TTL 同时是跨进程变更的最长滞后
+- 本进程内 User 行被更新/删除时自动失效：flush 时失效一次，提交后再失效一次
+  （与 RBAC 代号同样的两次失效，避免提交前并发未命中把旧行回填进缓存）；
+  其它写入路径可显式调用 invalidate_user()
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from app.settings import settings
+from app.common.ttl_cache import TTLCache
+from modules.core.backend.models.rbac import User
+
+@dataclass(frozen=True)
+class AuthUser:
+    """current_user 返回的身份（只读）；需要完整 User 时请按 id 自行查询。"""
+    id: int
+    username: str
+    full_name: str = ""
+    is_active: bool = True
+
+_USERS: TTLCache[AuthUser] = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL)
+# 失效计数：查库期间发生过失效则不回填（查到的可能是旧行）
+_INVALIDATIONS = 0
+
+async def _load_active_user(username: str) -> Optional[AuthUser]:
+    from app.db import async_session  # 仅未命中时才建会话
+    stmt = (
+        select(User.id, User.username, User.full_name)
+        .where(User.username == username, User.is_active == True)  # noqa: E712
+        .limit(1)
+    )
+    async with async_session() as db:
+        row = (await db.execute(stmt)).first()
+    if not row:
+        return None
+    return AuthUser(id=row.id, username=row.username, full_name=row.full_name or "")
+
+async def get_active_user(username: str) -> Optional[AuthUser]:
+    """命中缓存直接返回（纯内存）；未命中查库一次（只缓存存在且启用的用户）。"""
+    if not username:
+        return None
+    user = _USERS.get(username)
+    if user is not None:
+        return user
+    seen = _INVALIDATIONS
+    user = await _load_active_user(username)
+    if user is not None and seen == _INVALIDATIONS:
+        _USERS.set(username, user)
+    return user
+
+def user_cache_info() -> Dict[str, int]:
+    return {"hits": _USERS.hits, "misses": _USERS.misses, "size": len(_USERS)}
+
+def invalidate_user(username: Optional[str] = None) -> None:
+    """失效单个用户；username 为空则清空全部。"""
+    global _INVALIDATIONS
+    _INVALIDATIONS += 1
+    if username is None:
+        _USERS.clear()
+    else:
+        _USERS.pop(username)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _on_user_changed(_mapper, _conn, target: User) -> None:
+    _invalidate(target.username, target.id)
+    session = object_session(target)
+    if session is not None:
+        pending: Set[Tuple[str, int]] = session.info.setdefault("auth_users_dirty", set())
+        pending.add((target.username, target.id))
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session: Session) -> None:
+    for username, user_id in session.info.pop("auth_users_dirty", ()):
+        _invalidate(username, user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _on_rollback(session: Session) -> None:
+    session.info.pop("auth_users_dirty", None)
+
+def _invalidate(username: str, user_id: int) -> None:
+    invalidate_user(username)
+    # 改名时旧用户名的条目也要清掉
+    _USERS.discard_where(lambda _k, v: v.id == user_id)
@@ -0,0 +1,68 @@
+# app/services/hash_pool.py
+# -*- coding: utf-8 -*-
+"""
+口令哈希专用线程池（bcrypt 校验不占事件循环）
+
+- 固定大小：LOGIN_HASH_WORKERS（0 = min(4, CPU 数)）；bcrypt 在 C 层释放 GIL，线程即可并行
+- 背压：执行中 + 排队总数超过 workers + LOGIN_HASH_QUEUE 时立即抛 HashPoolBusy，
+  由调用方快速返回 503，而不是让登录洪峰无限排队拖垮同 worker 的其它请求
+"""
+from __future__ import annotations
+import asyncio, os, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+from app.settings import settings
+from app.security import verify_and_update
+
+class HashPoolBusy(RuntimeError):
+    """哈希池已满（执行中 + 排队达到上限）。"""
+
+class HashPool:
+    def __init__(self, workers: int, queue: int):
+        self.workers = workers if workers > 0 else min(4, os.cpu_count() or 1)
+        self.limit = self.workers + max(0, queue)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.rejected = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwhash")
+        return self._executor
+
+    def _release(self, _fut: Any = None) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._pending >= self.limit:
+                self.rejected += 1
+                raise HashPoolBusy(f"hash pool full ({self._pending}/{self.limit})")
+            self._pending += 1
+        try:
+            fut = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        fut.add_done_callback(self._release)
+        return await asyncio.wrap_future(fut)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+hash_pool = HashPool(settings.LOGIN_HASH_WORKERS, settings.LOGIN_HASH_QUEUE)
+
+async def verify_and_update_async(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """在哈希池中校验口令；需要换成本时返回新哈希（重算也在哈希池内完成）；池满时抛 HashPoolBusy。"""
+    return await hash_pool.run(verify_and_update, plain, hashed)
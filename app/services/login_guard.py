@@ -0,0 +1,226 @@
+# app/services/login_guard.py
+# -*- coding: utf-8 -*-
+"""
+登录准入控制（保护 bcrypt CPU）
+
+- 令牌桶：按来源 IP、按用户名各一只（LOGIN_IP_RATE / LOGIN_USER_RATE 次每分钟，BURST 为桶容量），
+  在查库与 bcrypt 之前判定；超限立即 429 + Retry-After
+- 并发闸：本进程同时进行的口令校验不超过 LOGIN_VERIFY_CONCURRENCY（0 = 哈希池容量：线程数 + LOGIN_HASH_QUEUE，
+  即允许按哈希池背压排队），超出同样 429
+- 后端（LOGIN_LIMIT_BACKEND）：
+    memory   进程内（默认；多 worker 时各自计数）
+    file     <NAV_CACHE_DIR>/login_buckets.sqlite3，同机多 worker 共享
+    postgres 主库 UNLOGGED 表 login_bucket（由迁移 0002_login_bucket 建表），多机共享
+  共享后端出错时退回进程内计数（不因限流组件故障拒绝登录）
+- 共享后端每 PRUNE_SECONDS 秒顺带删除已回满的桶行（ts 早于 容量/速率），键来自客户端（IP/用户名），
+  不清理会被撞库/喷洒无限撑大；删掉的行与“满桶”等价
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Tuple
+import logging, math, sqlite3, threading, time
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from app.settings import settings
+from app.services.hash_pool import hash_pool
+from app.services.metrics import LOGIN_THROTTLED
+
+logger = logging.getLogger("minipost")
+
+class LoginThrottled(RuntimeError):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"login throttled ({reason})")
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+PRUNE_SECONDS = 60.0
+
+def _refill(tokens: float, ts: float, now: float, rate: float, burst: float) -> float:
+    return min(burst, tokens + max(0.0, now - ts) * rate)
+
+def _full_after() -> float:
+    """任一桶从空到满所需的最长秒数：最后一次写入早于此的行必然已满，可删。"""
+    spans = [max(1, burst) * 60.0 / per_minute
+             for per_minute, burst in ((settings.LOGIN_IP_RATE, settings.LOGIN_IP_BURST),
+                                       (settings.LOGIN_USER_RATE, settings.LOGIN_USER_BURST))
+             if per_minute > 0]
+    return max(spans, default=0.0)
+
+class _Pruner:
+    """按间隔放行一次清理（多线程下只有一个拿到）。"""
+
+    def __init__(self) -> None:
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def due(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next:
+                return False
+            self._next = now + PRUNE_SECONDS
+            return True
+
+class MemoryBuckets:
+    """进程内令牌桶（有界 LRU；被挤出的键视为满桶）。"""
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        """取一个令牌：成功返回 0，否则返回需等待的秒数。"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._data.get(key, (burst, now))
+            tokens = _refill(tokens, ts, now, rate, burst)
+            if tokens < 1:
+                self._data[key] = (tokens, now)
+                self._data.move_to_end(key)
+                return (1 - tokens) / rate
+            self._data[key] = (tokens - 1, now)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return 0.0
+
+class SqliteBuckets:
+    """同机多 worker 共享：一个 sqlite 文件（WAL），每次取令牌一个短事务。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._pruner = _Pruner()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("CREATE TABLE IF NOT EXISTS login_bucket (key TEXT PRIMARY KEY, tokens REAL NOT NULL, ts REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_login_bucket_ts ON login_bucket (ts)")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, ts FROM login_bucket WHERE key = ?", (key,)).fetchone()
+            tokens = _refill(row[0], row[1], now, rate, burst) if row else burst
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            conn.execute(
+                "INSERT INTO login_bucket(key, tokens, ts) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, ts = excluded.ts",
+                (key, tokens - 1 if wait == 0 else tokens, now),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if self._pruner.due():
+            conn.execute("DELETE FROM login_bucket WHERE ts < ?", (now - _full_after(),))
+        return wait
+
+class PostgresBuckets:
+    """多机共享：主库 UNLOGGED 表（迁移建表，应用角色无需 CREATE 权限），单条 upsert 原子取令牌（不足时不扣减）。"""
+
+    _TAKE = text(
+        "INSERT INTO login_bucket AS b (key, tokens, ts) VALUES (:key, :burst - 1, :now) "
+        "ON CONFLICT (key) DO UPDATE SET "
+        "  tokens = LEAST(:burst, b.tokens + GREATEST(0, :now - b.ts) * :rate) - 1, ts = :now "
+        "WHERE LEAST(:burst, b.tokens + GREATEST(0, :now - b.ts) * :rate) >= 1 "
+        "RETURNING tokens"
+    )
+    _PEEK = text("SELECT LEAST(:burst, tokens + GREATEST(0, :now - ts) * :rate) FROM login_bucket WHERE key = :key")
+    _PRUNE = text("DELETE FROM login_bucket WHERE ts < :before")
+
+    def __init__(self) -> None:
+        self._pruner = _Pruner()
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        from app.db import engine
+        now = time.time()
+        params = {"key": key, "rate": rate, "burst": burst, "now": now}
+        with engine.begin() as conn:
+            if conn.execute(self._TAKE, params).first() is not None:
+                tokens = None
+            else:
+                tokens = conn.execute(self._PEEK, params).scalar() or 0.0
+        if self._pruner.due():
+            with engine.begin() as conn:
+                conn.execute(self._PRUNE, {"before": now - _full_after()})
+        return 0.0 if tokens is None else max(0.0, (1 - tokens) / rate)
+
+def _make_backend(name: str) -> Any:
+    if name == "file":
+        from app.services.nav_loader import cache_dir
+        d = cache_dir()
+        d.mkdir(parents=True, exist_ok=True)
+        return SqliteBuckets(str(d / "login_buckets.sqlite3"))
+    if name == "postgres":
+        return PostgresBuckets()
+    return None
+
+class LoginGuard:
+    def __init__(self) -> None:
+        self.local = MemoryBuckets()
+        self._shared: Any = None
+        self._shared_ready = False
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def concurrency(self) -> int:
+        return settings.LOGIN_VERIFY_CONCURRENCY if settings.LOGIN_VERIFY_CONCURRENCY > 0 else hash_pool.limit
+
+    def _shared_backend(self) -> Any:
+        if not self._shared_ready:
+            self._shared = _make_backend(settings.LOGIN_LIMIT_BACKEND)
+            self._shared_ready = True
+        return self._shared
+
+    async def _take(self, key: str, per_minute: float, burst: int) -> float:
+        if per_minute <= 0:
+            return 0.0
+        rate, cap = per_minute / 60.0, float(max(1, burst))
+        shared = self._shared_backend()
+        if shared is not None:
+            try:
+                return await run_in_threadpool(shared.take, key, rate, cap)
+            except Exception as e:
+                logger.warning("登录限流共享后端不可用，退回进程内计数：%s", e)
+        return self.local.take(key, rate, cap)
+
+    async def admit(self, ip: str, username: str) -> None:
+        """查库/校验前调用；超限抛 LoginThrottled。"""
+        wait = await self._take("ip:" + ip, settings.LOGIN_IP_RATE, settings.LOGIN_IP_BURST)
+        if wait > 0:
+            LOGIN_THROTTLED.inc("ip")
+            raise LoginThrottled("ip", wait)
+        wait = await self._take("user:" + username.lower(), settings.LOGIN_USER_RATE, settings.LOGIN_USER_BURST)
+        if wait > 0:
+            LOGIN_THROTTLED.inc("user")
+            raise LoginThrottled("user", wait)
+
+    @asynccontextmanager
+    async def verifying(self) -> AsyncIterator[None]:
+        """口令校验并发闸（不排队，满即拒绝）。"""
+        with self._lock:
+            if self._inflight >= self.concurrency:
+                LOGIN_THROTTLED.inc("concurrency")
+                raise LoginThrottled("concurrency", 1)
+            self._inflight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+login_guard = LoginGuard()
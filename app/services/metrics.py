@@ -0,0 +1,348 @@
+# app/services/metrics.py
+# -*- coding: utf-8 -*-
+"""
+Prometheus 文本格式指标（无第三方依赖）
+
+- 写入无锁：每个线程写自己的分片（dict），抓取时 dict.copy() 汇总（CPython 下 copy 为原子操作）
+- 指标：counter / histogram（固定桶）/ gauge（set 或抓取时回调）
+- 多 worker：设置 METRICS_DIR 后每个 worker 每 METRICS_FLUSH_SECONDS 秒把本进程累计值落盘，
+  /metrics 抓取时合并所有存活 worker 的文件（gauge 只取本进程）
+- MetricsMiddleware：按路由模板记录请求延迟，并统计每个请求的 DB 查询次数/耗时
+"""
+from __future__ import annotations
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import json, os, threading, time, logging
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.settings import settings
+
+logger = logging.getLogger("minipost")
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Key = Tuple[str, Tuple[str, ...]]
+
+class _Shard:
+    __slots__ = ("counters", "hists")
+
+    def __init__(self) -> None:
+        self.counters: Dict[Key, float] = {}
+        self.hists: Dict[Key, List[float]] = {}   # [桶计数..., sum, count]
+
+class Registry:
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._lock = threading.Lock()             # 只在新线程注册分片时使用
+        self.meta: Dict[str, Tuple[str, str, Tuple[str, ...], Tuple[float, ...]]] = {}
+        self.gauges: Dict[Key, float] = {}
+        self.callbacks: Dict[str, Callable[[], Dict[Tuple[str, ...], float]]] = {}
+
+    def shard(self) -> _Shard:
+        s = getattr(self._local, "shard", None)
+        if s is None:
+            s = _Shard()
+            with self._lock:
+                self._shards.append(s)
+            self._local.shard = s
+        return s
+
+    def collect(self) -> Tuple[Dict[Key, float], Dict[Key, List[float]]]:
+        counters: Dict[Key, float] = {}
+        hists: Dict[Key, List[float]] = {}
+        with self._lock:
+            shards = list(self._shards)
+        for s in shards:
+            for k, v in s.counters.copy().items():
+                counters[k] = counters.get(k, 0.0) + v
+            for k, v in s.hists.copy().items():
+                v = list(v)
+                cur = hists.get(k)
+                hists[k] = v if cur is None else [a + b for a, b in zip(cur, v)]
+        return counters, hists
+
+REGISTRY = Registry()
+
+class Counter:
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = (), fn: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        self.name, self.labels = name, tuple(labels)
+        REGISTRY.meta[name] = ("counter", doc, self.labels, ())
+        if fn is not None:
+            REGISTRY.callbacks[name] = fn
+
+    def inc(self, *label_values: str, value: float = 1.0) -> None:
+        if not settings.METRICS_ENABLED:
+            return
+        c = REGISTRY.shard().counters
+        k = (self.name, label_values)
+        c[k] = c.get(k, 0.0) + value
+
+class Histogram:
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.labels, self.buckets = name, tuple(labels), tuple(buckets)
+        REGISTRY.meta[name] = ("histogram", doc, self.labels, self.buckets)
+
+    def observe(self, value: float, *label_values: str) -> None:
+        if not settings.METRICS_ENABLED:
+            return
+        h = REGISTRY.shard().hists
+        k = (self.name, label_values)
+        row = h.get(k)
+        if row is None:
+            row = h[k] = [0.0] * (len(self.buckets) + 2)
+        for i, b in enumerate(self.buckets):
+            if value <= b:
+                row[i] += 1
+                break
+        row[-2] += value
+        row[-1] += 1
+
+class Gauge:
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = (), fn: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        self.name, self.labels = name, tuple(labels)
+        REGISTRY.meta[name] = ("gauge", doc, self.labels, ())
+        if fn is not None:
+            REGISTRY.callbacks[name] = fn
+
+    def set(self, value: float, *label_values: str) -> None:
+        REGISTRY.gauges[(self.name, label_values)] = float(value)
+
+# ---- 指标定义 ----
+HTTP_REQUEST_SECONDS = Histogram("minipost_http_request_seconds", "HTTP 请求耗时（按路由模板）", ("route", "method", "status"))
+DB_QUERIES_PER_REQUEST = Histogram("minipost_db_queries_per_request", "单个请求内的 DB 查询次数", ("route",),
+                                   buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50))
+DB_QUERY_SECONDS = Counter("minipost_db_query_seconds_total", "DB 查询累计耗时（按路由模板）", ("route",))
+DB_QUERIES = Counter("minipost_db_queries_total", "DB 查询次数（按路由模板）", ("route",))
+NAV_CACHE = Counter("minipost_nav_cache_total", "导航响应缓存命中（hit/miss/not_modified）", ("result",))
+NAV_REBUILD_SECONDS = Histogram("minipost_nav_rebuild_seconds", "rebuild_nav 耗时")
+NAV_STATS = Gauge("minipost_nav_last_rebuild", "最近一次 rebuild_nav 的统计（modules/menus/tabs/parsed/parse_workers/changed）", ("stat",))
+PASSWORD_VERIFY_SECONDS = Histogram("minipost_password_verify_seconds", "口令校验（bcrypt）耗时")
+LOGIN_THROTTLED = Counter("minipost_login_throttled_total", "登录准入拒绝次数（ip/user/concurrency）", ("reason",))
+
+def _cache_events() -> Dict[Tuple[str, ...], float]:
+    from app.services.auth_cache import user_cache_info
+    from modules.core.backend.services.rbac import permission_cache_info
+    out: Dict[Tuple[str, ...], float] = {}
+    for cache, info in (("auth_user", user_cache_info()), ("permissions", permission_cache_info())):
+        out[(cache, "hit")] = info["hits"]
+        out[(cache, "miss")] = info["misses"]
+    return out
+
+def _hash_pool_rejected() -> Dict[Tuple[str, ...], float]:
+    from app.services.hash_pool import hash_pool
+    return {(): hash_pool.rejected}
+
+def _runtime_gauges() -> Dict[Tuple[str, ...], float]:
+    from app.common.utils import get_nav_snapshot
+    from app.services.hash_pool import hash_pool
+    snap = get_nav_snapshot()
+    return {
+        ("nav_generation",): snap.generation,
+        ("nav_age_seconds",): (time.time() - snap.ts) if snap.ts else -1,
+        ("hash_pool_pending",): hash_pool.pending,
+    }
+
+CACHE_EVENTS = Counter("minipost_cache_total", "进程内缓存命中/未命中", ("cache", "result"), fn=_cache_events)
+HASH_POOL_REJECTED = Counter("minipost_hash_pool_rejected_total", "哈希池满被拒绝的登录次数", fn=_hash_pool_rejected)
+RUNTIME = Gauge("minipost_runtime", "运行时状态（导航代号/年龄、哈希池排队）", ("name",), fn=_runtime_gauges)
+
+# ---- 每请求 DB 统计 ----
+class _RequestDB:
+    __slots__ = ("count", "seconds")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+
+_REQUEST_DB: ContextVar[Optional[_RequestDB]] = ContextVar("minipost_request_db", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, _cursor, _stmt, _params, _context, _many):
+    conn.info.setdefault("_query_t0", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, _cursor, _stmt, _params, _context, _many):
+    stack = conn.info.get("_query_t0")
+    if not stack:
+        return
+    elapsed = time.perf_counter() - stack.pop()
+    rq = _REQUEST_DB.get()
+    if rq is not None:
+        rq.count += 1
+        rq.seconds += elapsed
+
+class MetricsMiddleware:
+    """纯 ASGI 中间件；路由模板取 FastAPI 写入 scope 的 route.path。"""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        status_holder = ["500"]
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = str(message["status"])
+            await send(message)
+
+        rq = _RequestDB()
+        token = _REQUEST_DB.set(rq)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            elapsed = time.perf_counter() - t0
+            _REQUEST_DB.reset(token)
+            route = scope.get("route")
+            if route is not None:
+                label = getattr(route, "path", "unmatched")
+            elif scope.get("path", "").startswith("/static/"):
+                label = "/static"
+            else:
+                label = "unmatched"
+            HTTP_REQUEST_SECONDS.observe(elapsed, label, scope.get("method", ""), status_holder[0])
+            DB_QUERIES_PER_REQUEST.observe(rq.count, label)
+            if rq.count:
+                DB_QUERIES.inc(label, value=rq.count)
+                DB_QUERY_SECONDS.inc(label, value=rq.seconds)
+
+# ---- 多 worker 落盘/合并 ----
+def _metrics_dir() -> Optional[Path]:
+    return Path(settings.METRICS_DIR) if settings.METRICS_DIR else None
+
+def _dump(counters: Dict[Key, float], hists: Dict[Key, List[float]]) -> Dict[str, Any]:
+    return {
+        "counters": [[k[0], list(k[1]), v] for k, v in counters.items()],
+        "hists": [[k[0], list(k[1]), v] for k, v in hists.items()],
+    }
+
+def _flush_once() -> None:
+    d = _metrics_dir()
+    if d is None:
+        return
+    counters, hists = REGISTRY.collect()
+    d.mkdir(parents=True, exist_ok=True)
+    tmp = d / f".{os.getpid()}.tmp"
+    tmp.write_text(json.dumps(_dump(counters, hists)), encoding="utf-8")
+    os.replace(tmp, d / f"{os.getpid()}.json")
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _merge_workers(counters: Dict[Key, float], hists: Dict[Key, List[float]]) -> None:
+    d = _metrics_dir()
+    if d is None or not d.exists():
+        return
+    me = os.getpid()
+    for f in d.glob("*.json"):
+        try:
+            pid = int(f.stem)
+        except ValueError:
+            continue
+        if pid == me:
+            continue
+        if not _pid_alive(pid):
+            # 已退出的 worker：累计值随进程一起作废（计数器重置由 Prometheus rate() 处理）
+            f.unlink(missing_ok=True)
+            continue
+        try:
+            data = json.loads(f.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        for name, labels, v in data.get("counters", []):
+            k = (name, tuple(labels))
+            counters[k] = counters.get(k, 0.0) + v
+        for name, labels, v in data.get("hists", []):
+            k = (name, tuple(labels))
+            cur = hists.get(k)
+            hists[k] = list(v) if cur is None else [a + b for a, b in zip(cur, v)]
+
+_FLUSHER: Optional[threading.Thread] = None
+_FLUSH_STOP = threading.Event()
+
+def start_metrics_flusher() -> None:
+    global _FLUSHER
+    if not settings.METRICS_ENABLED or _metrics_dir() is None or _FLUSHER is not None:
+        return
+
+    def _loop():
+        while not _FLUSH_STOP.wait(settings.METRICS_FLUSH_SECONDS):
+            try:
+                _flush_once()
+            except Exception as e:
+                logger.warning("指标落盘失败：%s", e)
+
+    _FLUSHER = threading.Thread(target=_loop, name="metrics-flush", daemon=True)
+    _FLUSHER.start()
+
+def stop_metrics_flusher() -> None:
+    _FLUSH_STOP.set()
+    d = _metrics_dir()
+    if d is not None:
+        (d / f"{os.getpid()}.json").unlink(missing_ok=True)
+
+# ---- 文本输出 ----
+def _fmt_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = []
+    for n, v in zip(names, values):
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{n}="{v}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _fmt_num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+def render() -> str:
+    counters, hists = REGISTRY.collect()
+    _merge_workers(counters, hists)
+    gauges = dict(REGISTRY.gauges)
+    # 回调型指标：抓取时才读取各组件已有的计数（本进程）
+    for name, fn in list(REGISTRY.callbacks.items()):
+        target = counters if REGISTRY.meta[name][0] == "counter" else gauges
+        try:
+            for labels, v in fn().items():
+                target[(name, labels)] = target.get((name, labels), 0.0) + float(v)
+        except Exception as e:
+            logger.warning("指标回调 %s 失败：%s", name, e)
+
+    lines: List[str] = []
+    for name, (kind, doc, label_names, buckets) in sorted(REGISTRY.meta.items()):
+        lines.append(f"# HELP {name} {doc}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for (n, lv), v in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_fmt_labels(label_names, lv)} {_fmt_num(v)}")
+        elif kind == "gauge":
+            for (n, lv), v in sorted(gauges.items()):
+                if n == name:
+                    lines.append(f"{name}{_fmt_labels(label_names, lv)} {_fmt_num(v)}")
+        else:
+            for (n, lv), row in sorted(hists.items()):
+                if n != name:
+                    continue
+                acc = 0.0
+                for b, c in zip(buckets, row):
+                    acc += c
+                    le = 'le="%s"' % _fmt_num(b)
+                    lines.append(f"{name}_bucket{_fmt_labels(label_names, lv, le)} {_fmt_num(acc)}")
+                le = 'le="+Inf"'
+                lines.append(f"{name}_bucket{_fmt_labels(label_names, lv, le)} {_fmt_num(row[-1])}")
+                lines.append(f"{name}_sum{_fmt_labels(label_names, lv)} {_fmt_num(row[-2])}")
+                lines.append(f"{name}_count{_fmt_labels(label_names, lv)} {_fmt_num(row[-1])}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,209 @@
+# app/services/module_loader.py
+# -*- coding: utf-8 -*-
+"""
+模块后端路由加载
+
+- 发现：modules/**/backend/routers/*.py，按所在模块（backend/ 的上级目录）分组
+- 元数据：<模块>/config/module.meta.yaml
+    enabled: true      # false 则整个模块不导入
+    order: 100         # 小的先加载（同 order 按路径）
+    lazy: false        # true（或 MODULES_LAZY）且声明了 prefix 时，首个命中该前缀的请求才导入并挂载
+    prefix: /api/xxx   # 字符串或列表；懒加载的匹配前缀
+- 按包路径（modules.xxx.backend.routers.yyy）导入，与显式 import 共用 sys.modules，同一模块/同一 router 只挂一次
+- 每个模块记录导入耗时与状态，经 /internal/modules 查看
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+import importlib, importlib.util, logging, sys, threading, time
+
+import yaml
+from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
+
+from app.settings import settings
+from app.services.nav_loader import BASE_DIR, MODULES_DIR
+
+logger = logging.getLogger("minipost")
+
+META_FILE = "module.meta.yaml"
+
+@dataclass
+class ModuleEntry:
+    key: str                       # 相对仓库根的模块目录（posix）
+    files: List[Path]
+    enabled: bool = True
+    order: int = 100
+    lazy: bool = False
+    prefixes: Tuple[str, ...] = ()
+    status: str = "pending"        # pending / loaded / lazy / disabled / failed
+    seconds: float = 0.0
+    routers: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "module": self.key, "status": self.status, "order": self.order, "lazy": self.lazy,
+            "prefixes": list(self.prefixes), "routers": self.routers,
+            "import_ms": round(self.seconds * 1000, 3), "errors": self.errors,
+        }
+
+def _read_meta(root: Path) -> Dict[str, Any]:
+    p = root / "config" / META_FILE
+    try:
+        data = yaml.safe_load(p.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        logger.warning("模块元数据读取失败（%s）：%s", p, e)
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def discover_modules() -> List[ModuleEntry]:
+    groups: Dict[Path, List[Path]] = {}
+    for py in MODULES_DIR.rglob("backend/routers/*.py"):
+        if py.name.startswith("_"):
+            continue
+        groups.setdefault(py.parents[2], []).append(py)
+    entries: List[ModuleEntry] = []
+    for root, files in groups.items():
+        meta = _read_meta(root)
+        prefix = meta.get("prefix") or ()
+        prefixes = tuple(p.rstrip("/") or "/" for p in ([prefix] if isinstance(prefix, str) else prefix) if isinstance(p, str) and p.startswith("/"))
+        entries.append(ModuleEntry(
+            key=root.relative_to(BASE_DIR).as_posix(),
+            files=sorted(files),
+            enabled=bool(meta.get("enabled", True)),
+            order=int(meta.get("order", 100)),
+            lazy=bool(meta.get("lazy", settings.MODULES_LAZY)) and bool(prefixes),
+            prefixes=prefixes,
+        ))
+    entries.sort(key=lambda e: (e.order, e.key))
+    return entries
+
+def _import(py: Path) -> Any:
+    parts = py.relative_to(BASE_DIR).with_suffix("").parts
+    if all(p.isidentifier() for p in parts):
+        return importlib.import_module(".".join(parts))
+    # 目录名不是合法标识符（如含 -）：按文件导入，同样登记进 sys.modules 防重复
+    name = "modules_" + "_".join(parts[1:]).replace("-", "_")
+    mod = sys.modules.get(name)
+    if mod is not None:
+        return mod
+    spec = importlib.util.spec_from_file_location(name, py)
+    if not spec or not spec.loader:
+        raise ImportError(f"无法加载 {py}")
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    try:
+        spec.loader.exec_module(mod)
+    except BaseException:
+        sys.modules.pop(name, None)
+        raise
+    return mod
+
+class ModuleLoader:
+    def __init__(self) -> None:
+        self.entries: List[ModuleEntry] = []
+        self._app: Optional[FastAPI] = None
+        self._included: Set[int] = set()
+        self._insert_at = 0
+        self._lock = threading.Lock()
+        self.pending = 0  # 尚未挂载的懒加载模块数；为 0 时中间件零开销
+
+    def load(self, app: FastAPI) -> None:
+        """启动期调用一次：非懒加载模块按顺序导入并挂载，懒加载模块只登记前缀。"""
+        self._app = app
+        self.entries = discover_modules()
+        for e in self.entries:
+            if not e.enabled:
+                e.status = "disabled"
+            elif e.lazy:
+                e.status = "lazy"
+                self.pending += 1
+            else:
+                self._mount(e)
+        # 之后注册的通用回落路由（/{full_path:path}）之前的位置，懒挂载的路由插到这里
+        self._insert_at = len(app.router.routes)
+        loaded = [e for e in self.entries if e.status == "loaded"]
+        logger.info("模块路由：加载 %d 个（%.1f ms），懒加载 %d 个，停用 %d 个",
+                    len(loaded), sum(e.seconds for e in loaded) * 1000,
+                    sum(e.status == "lazy" for e in self.entries), sum(e.status == "disabled" for e in self.entries))
+
+    def _import_routers(self, e: ModuleEntry) -> Tuple[List[Any], List[str], float]:
+        """导入模块的全部路由文件（慢，可在线程池执行）；返回 (router 列表, 错误, 耗时秒)。"""
+        routers: List[Any] = []
+        errors: List[str] = []
+        t0 = time.perf_counter()
+        with self._lock:
+            for py in e.files:
+                try:
+                    r = getattr(_import(py), "router", None)
+                except Exception as ex:
+                    logger.exception("模块路由导入失败 %s：%s", py, ex)
+                    errors.append(f"{py.name}: {ex}")
+                    continue
+                if r is not None:
+                    routers.append(r)
+        return routers, errors, time.perf_counter() - t0
+
+    def _mount(self, e: ModuleEntry) -> None:
+        self._attach(e, *self._import_routers(e))
+
+    def _attach(self, e: ModuleEntry, routers: List[Any], errors: List[str], seconds: float) -> None:
+        """挂载已导入的 router（快）；懒加载时在事件循环线程调用，路由表不会在其它请求匹配途中被改动。"""
+        app = self._app
+        assert app is not None
+        before = len(app.router.routes)
+        t0 = time.perf_counter()
+        e.errors.extend(errors)
+        for r in routers:
+            if id(r) in self._included:
+                continue
+            app.include_router(r)
+            self._included.add(id(r))
+            e.routers += 1
+        e.seconds = seconds + time.perf_counter() - t0
+        if e.status == "lazy":
+            self.pending -= 1
+        e.status = "failed" if e.errors and not e.routers else "loaded"
+        if self._insert_at and self._insert_at < before:
+            # 懒挂载：把新增路由移到回落路由之前
+            added = app.router.routes[before:]
+            del app.router.routes[before:]
+            app.router.routes[self._insert_at:self._insert_at] = added
+            self._insert_at += len(added)
+            app.openapi_schema = None
+        logger.info("模块 %s：%d 个路由器（%.1f ms）", e.key, e.routers, e.seconds * 1000)
+
+    def pending_for(self, path: str) -> Optional[ModuleEntry]:
+        for e in self.entries:
+            if e.status == "lazy" and any(path == p or path.startswith(p.rstrip("/") + "/") for p in e.prefixes):
+                return e
+        return None
+
+    async def ensure_mounted(self, path: str) -> None:
+        """导入放线程池，挂载回到事件循环线程（同一模块并发触发时只挂一次）。"""
+        e = self.pending_for(path)
+        if e is None:
+            return
+        imported = await run_in_threadpool(self._import_routers, e)
+        if e.status == "lazy":
+            self._attach(e, *imported)
+
+    def info(self) -> List[Dict[str, Any]]:
+        return [e.info() for e in self.entries]
+
+module_loader = ModuleLoader()
+
+class LazyModuleMiddleware:
+    """纯 ASGI：请求路径命中尚未挂载的懒加载模块前缀时，先导入并挂载再继续路由。"""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if module_loader.pending and scope["type"] == "http" and module_loader.pending_for(scope["path"]) is not None:
+            await module_loader.ensure_mounted(scope["path"])
+        await self.app(scope, receive, send)
@@ -0,0 +1,126 @@
+# app/services/module_templates.py
+# -*- coding: utf-8 -*-
+"""
+L3 模块模板引擎
+
+- Loader 只允许 modules/**/frontend/templates 目录（以及 tabs.register 显式 template
+  所在的 modules/ 下目录），不再以仓库根为搜索目录
+- 每个导航代（NavSnapshot.generation）建一个新 Environment，并预编译全部已注册页签模板；
+  字节码缓存落盘到 <NAV_CACHE_DIR>/jinja，重启/多 worker 复用
+- auto_reload 关闭：模板变化经 nav 重载（或监视器）生效，请求期不 stat 模板文件
+- 渲染走 Template.generate() 流式输出
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+import logging, threading
+
+import jinja2
+from starlette.responses import StreamingResponse
+
+from app.common.utils import NavSnapshot
+from app.services.nav_loader import BASE_DIR, cache_dir, discover_templates
+
+logger = logging.getLogger("minipost")
+
+class ModuleTemplateLoader(jinja2.BaseLoader):
+    """模板名为相对仓库根的 posix 路径；所在目录必须在白名单内。"""
+
+    def __init__(self, allowed_dirs: FrozenSet[str]):
+        self.allowed_dirs = allowed_dirs
+
+    def get_source(self, environment: jinja2.Environment, template: str) -> Tuple[str, str, Callable[[], bool]]:
+        name = template.replace("\\", "/").lstrip("/")
+        parent = name.rsplit("/", 1)[0] if "/" in name else ""
+        if ".." in name.split("/") or parent not in self.allowed_dirs:
+            raise jinja2.TemplateNotFound(template)
+        path = BASE_DIR / name
+        try:
+            source = path.read_text(encoding="utf-8")
+            mtime = path.stat().st_mtime
+        except OSError:
+            raise jinja2.TemplateNotFound(template)
+        filename = str(path)
+        return source, filename, lambda: _mtime(filename) == mtime
+
+    def list_templates(self) -> List[str]:
+        """白名单目录下（不递归，与 get_source 的目录判定一致）可加载的模板名。"""
+        names: List[str] = []
+        for d in self.allowed_dirs:
+            try:
+                names.extend(f"{d}/{p.name}" for p in (BASE_DIR / d).iterdir() if p.is_file() and not p.name.startswith("."))
+            except OSError:
+                continue
+        return sorted(names)
+
+def _mtime(filename: str) -> Optional[float]:
+    try:
+        return Path(filename).stat().st_mtime
+    except OSError:
+        return None
+
+@jinja2.pass_context
+def _url_for(context: Dict[str, Any], name: str, /, **path_params: Any) -> Any:
+    # 与 starlette Jinja2Templates 注入的 url_for 一致
+    return context["request"].url_for(name, **path_params)
+
+def _bytecode_cache() -> Optional[jinja2.BytecodeCache]:
+    d = cache_dir() / "jinja"
+    try:
+        d.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        logger.warning("模板字节码缓存目录不可用（%s）：%s", d, e)
+        return None
+    return jinja2.FileSystemBytecodeCache(str(d))
+
+class ModuleTemplates:
+    def __init__(self) -> None:
+        self._generation = -1
+        self._env: Optional[jinja2.Environment] = None
+        self._lock = threading.Lock()
+        self._bcc: Optional[jinja2.BytecodeCache] = None
+        self._bcc_ready = False
+
+    def _build_env(self, snap: NavSnapshot) -> jinja2.Environment:
+        dirs = {p.rsplit("/", 1)[0] for p in discover_templates()}
+        for p in snap.routes.values():
+            d = p.replace("\\", "/").lstrip("/").rsplit("/", 1)[0]
+            if d.startswith("modules/"):  # 显式 template 也只接受 modules/ 下的目录
+                dirs.add(d)
+        if not self._bcc_ready:
+            self._bcc, self._bcc_ready = _bytecode_cache(), True
+        env = jinja2.Environment(
+            loader=ModuleTemplateLoader(frozenset(dirs)),
+            autoescape=True,
+            auto_reload=False,
+            cache_size=-1,
+            bytecode_cache=self._bcc,
+        )
+        env.globals.setdefault("url_for", _url_for)
+        return env
+
+    def prepare(self, snap: NavSnapshot) -> jinja2.Environment:
+        """为该导航代建环境并预编译全部已注册模板（同一代只做一次）。"""
+        env = self._env
+        if env is not None and self._generation == snap.generation:
+            return env
+        with self._lock:
+            if self._env is None or self._generation != snap.generation:
+                env = self._build_env(snap)
+                ok = failed = 0
+                for path in sorted(set(snap.routes.values())):
+                    try:
+                        env.get_template(path)
+                        ok += 1
+                    except Exception as e:
+                        failed += 1
+                        logger.warning("模板预编译失败 %s：%s", path, e)
+                self._env, self._generation = env, snap.generation
+                logger.info("L3 模板预编译完成：%d 个成功，%d 个失败", ok, failed)
+            return self._env
+
+    def stream(self, snap: NavSnapshot, template_path: str, context: Dict[str, Any]) -> StreamingResponse:
+        template = self.prepare(snap).get_template(template_path)
+        return StreamingResponse(template.generate(context), media_type="text/html; charset=utf-8")
+
+module_templates = ModuleTemplates()
@@ -10,30 +10,43 @@
 - 返回：
     {
       "menu": {...}, "tabs": {...},
+      "routes": { "<tab href>": "<模板相对路径>", ... },   # 供 serve_tab_page 单次字典查找
       "generated_at": ISO8601Z,
       "hash": "sha1-16",
-      "stats": { "modules": N, "menus": M, "tabs": T }
+      "stats": { "modules": N, "menus": M, "tabs": T, "parsed": 本次实际解析的文件数,
+                 "parse_workers": 解析进程数, "parse_ms": {"<文件相对路径>": 毫秒} },
+      "changed": [本次新增/变更/移除的模块 key]
     }
+- 增量：文件按 (path, mtime, size, sha1) 缓存解析结果，模块贡献按文件指纹缓存，
+  reload 时只重新解析/校验变化的文件
+- 解析：优先 libyaml CSafeLoader；命令行重建（parallel=True）且待解析内容 ≥ NAV_PARSE_PARALLEL_MIN_BYTES
+  时用进程池并行解析，结果仍按扫描顺序合并，hash 与串行完全一致；服务进程（启动/热重载）始终串行
+- 快照：write_cache=True 时把结果写入 <NAV_CACHE_DIR>/nav.snapshot.json（按全部 register 文件
+  + 模板清单的组合指纹区分）；load_nav() 指纹一致时直接读快照，多 worker 共享、免解析 YAML
 """
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Set, Tuple
 from datetime import datetime, timezone
-import hashlib, json
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import hashlib, json, multiprocessing, os, tempfile, threading, logging, time
 
 try:
     import yaml  # type: ignore
 except Exception as e:  # pragma: no cover
     raise RuntimeError("需要 PyYAML，请先安装：pip install pyyaml") from e
 
+from app.settings import settings
+from app.common.yaml_parse import parse_timed, parse_yaml as _parse_yaml
+from app.services.metrics import NAV_REBUILD_SECONDS, NAV_STATS
+
+logger = logging.getLogger("minipost")
+
 BASE_DIR    = Path(__file__).resolve().parents[2]   # .../minipost-main
 MODULES_DIR = BASE_DIR / "modules"
-
-def _read_yaml(p: Path) -> Any:
-    if not p.exists(): return None
-    text = p.read_text(encoding="utf-8")
-    data = yaml.safe_load(text)
-    return data if data is not None else {}
+REGISTER_FILES = ("menu.register.yaml", "tabs.register.yaml")
+SNAPSHOT_VERSION = 1
 
 def _sorted_inplace(bucket: List[dict], key_name: str) -> None:
     for it in bucket:
@@ -41,6 +54,11 @@ def _sorted_inplace(bucket: List[dict], key_name: str) -> None:
             it["order"] = 100
     bucket.sort(key=lambda d: (d.get("order", 100), str(d.get(key_name, ""))))
 
+def _permission(it: dict) -> str:
+    """可选的查看权限键（permissions.register 中声明的 key）；缺省为公开。"""
+    p = it.get("permission")
+    return p.strip() if isinstance(p, str) else ""
+
 def _norm_menu_item(it: dict) -> dict:
     row = {
         "text":  str(it["text"]).strip(),
@@ -49,6 +67,7 @@ def _norm_menu_item(it: dict) -> dict:
     }
     if isinstance(it.get("icon"), str):    row["icon"]    = it["icon"].strip()
     if "default" in it:                    row["default"] = bool(it.get("default"))
+    if _permission(it):                    row["permission"] = _permission(it)
     return row
 
 def _norm_tab_item(it: dict) -> dict:
@@ -61,80 +80,340 @@ def _norm_tab_item(it: dict) -> dict:
     if isinstance(it.get("template"), str): row["template"] = it["template"].strip()
     if isinstance(it.get("icon"), str):     row["icon"]     = it["icon"].strip()
     if "default" in it:                     row["default"]  = bool(it.get("default"))
+    if _permission(it):                     row["permission"] = _permission(it)
     return row
 
-def rebuild_nav(write_cache: bool = True) -> Dict[str, Any]:
+# ---- 路由索引：href → L3 模板（随导航一起重建，替代请求期的 exists()/rglob）----
+def discover_templates() -> List[str]:
+    """一次性列出 modules/**/frontend/templates/*.html（相对 BASE_DIR，posix，已排序）。"""
+    return sorted(p.relative_to(BASE_DIR).as_posix() for p in MODULES_DIR.rglob("frontend/templates/*.html"))
+
+def _guess_template(href: str, known: Set[str], ordered: List[str]) -> Optional[str]:
+    """tabs.register 未填 template 时按约定路径猜测；只查预先发现的模板集合，不触盘。"""
+    parts = [p for p in href.strip("/").split("/") if p]
+    if len(parts) < 3:
+        return None
+    l1, l2, l3 = parts[:3]
+    cands = [
+        f"modules/{l1}_{l2}/{l1}_{l3}/frontend/templates/{l1}_{l3}.html",
+        f"modules/{l1}_{l2}/{l1}_{l3}/frontend/templates/index.html",
+        f"modules/{l1}_{l2}/{l3}/frontend/templates/{l3}.html",
+        f"modules/{l1}_{l2}/{l3}/frontend/templates/index.html",
+    ]
+    for c in cands:
+        if c in known:
+            return c
+    # 模糊兜底
+    needle = f"/{l3}.html"
+    for p in ordered:
+        if needle in p:
+            return p
+    return None
+
+def _build_route_index(tabs: Dict[str, List[dict]], templates: List[str]) -> Dict[str, str]:
+    """同一 href 出现在多个 L2 下时，取第一个能解析出模板的页签（与旧版逐项遍历一致）。"""
+    known = set(templates)
+    routes: Dict[str, str] = {}
+    for items in tabs.values():
+        for it in items:
+            href = it["href"]
+            if href in routes:
+                continue
+            tpl = (it.get("template") or "").strip() or _guess_template(href, known, templates)
+            if tpl:
+                routes[href] = tpl
+    return routes
+
+# ---- 增量聚合：文件级解析缓存 + 模块级贡献缓存 ----
+# 文件缓存：abs path → (mtime_ns, size, sha1, data)；stat 未变直接命中，变了再比内容 hash
+_FILE_CACHE: Dict[str, Tuple[int, int, str, Any]] = {}
+# 模块缓存：mod_key → ((menu 指纹, tabs 指纹), 贡献)；贡献为已校验/规范化、未去重排序的条目
+_MODULE_CACHE: Dict[str, Tuple[Tuple[Optional[str], Optional[str]], Dict[str, Any]]] = {}
+_BUILD_LOCK = threading.Lock()
+
+def _load_yaml_cached(p: Path, file_cache: Dict[str, Tuple[int, int, str, Any]]) -> Tuple[Optional[str], Any, bool]:
+    """返回 (内容指纹, data, 是否重新解析)；文件不存在时指纹为 None。"""
+    key = str(p)
+    try:
+        st = p.stat()
+    except FileNotFoundError:
+        file_cache.pop(key, None)
+        return None, None, False
+    hit = file_cache.get(key)
+    if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+        return hit[2], hit[3], False
+    raw = p.read_bytes()
+    sha = hashlib.sha1(raw).hexdigest()
+    if hit and hit[2] == sha:
+        file_cache[key] = (st.st_mtime_ns, st.st_size, sha, hit[3])
+        return sha, hit[3], False
+    data = _parse_yaml(raw)
+    file_cache[key] = (st.st_mtime_ns, st.st_size, sha, data)
+    return sha, data, True
+
+def _parse_workers(files: int, size: int) -> int:
+    if files < 2 or size < settings.NAV_PARSE_PARALLEL_MIN_BYTES:
+        return 1
+    workers = settings.NAV_PARSE_WORKERS if settings.NAV_PARSE_WORKERS > 0 else min(os.cpu_count() or 1, 8)
+    return max(1, min(workers, files))
+
+def _parse_all(raws: List[bytes], workers: int) -> Tuple[List[Tuple[bool, Any, float]], int]:
+    if workers > 1:
+        try:
+            # spawn：子进程只导入 app.common.yaml_parse，不继承父进程的线程/连接池
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                return list(pool.map(parse_timed, raws, chunksize=max(1, len(raws) // (workers * 4)))), workers
+        except (OSError, BrokenProcessPool) as e:
+            logger.warning("导航并行解析不可用，改为串行：%s", e)
+    return [parse_timed(raw) for raw in raws], 1
+
+def _preparse(paths: List[Path], file_cache: Dict[str, Tuple[int, int, str, Any]], parallel: bool) -> Tuple[Dict[str, float], int]:
+    """
+    预解析：找出内容变化的 register 文件，批量解析后写回 file_cache（随后 _load_yaml_cached 直接命中）。
+    返回 ({相对路径: 解析毫秒}, 解析进程数)。
+    """
+    todo: List[Tuple[Path, int, int, str]] = []
+    raws: List[bytes] = []
+    for p in paths:
+        key = str(p)
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        hit = file_cache.get(key)
+        if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+            continue
+        raw = p.read_bytes()
+        sha = hashlib.sha1(raw).hexdigest()
+        if hit and hit[2] == sha:
+            file_cache[key] = (st.st_mtime_ns, st.st_size, sha, hit[3])
+            continue
+        todo.append((p, st.st_mtime_ns, st.st_size, sha))
+        raws.append(raw)
+    results, workers = _parse_all(raws, _parse_workers(len(raws), sum(map(len, raws))) if parallel else 1)
+    timings: Dict[str, float] = {}
+    for (p, mtime, size, sha), (ok, data, seconds) in zip(todo, results):
+        rel = p.relative_to(BASE_DIR).as_posix()
+        if not ok:
+            raise ValueError(f"[{rel}] YAML 解析失败：{data}")
+        file_cache[str(p)] = (mtime, size, sha, data)
+        timings[rel] = round(seconds * 1000, 3)
+    return dict(sorted(timings.items())), workers
+
+def _collect_menu(mod_key: str, data: Any) -> Tuple[Dict[str, List[dict]], int]:
+    if not isinstance(data, dict):
+        raise ValueError(f"[{mod_key}] menu.register.yaml 必须为对象：L1 → items[]")
+    out: Dict[str, List[dict]] = {}
+    count = 0
+    for l1, items in data.items():
+        if not isinstance(l1, str) or not l1.strip():
+            raise ValueError(f"[{mod_key}] menu.register L1（键）必须为非空字符串")
+        if not isinstance(items, list):
+            raise ValueError(f"[{mod_key}] menu.register.{l1} 必须为数组")
+        bucket = out.setdefault(l1, [])
+        for it in items:
+            if not isinstance(it, dict):
+                raise ValueError(f"[{mod_key}] menu.register.{l1}[] 必须为对象")
+            for k in ("text", "href"):
+                if k not in it or not isinstance(it[k], str) or not it[k].strip():
+                    raise ValueError(f"[{mod_key}] menu.register.{l1}[] 缺少/非法字段：{k}")
+            if not str(it["href"]).startswith("/"):
+                raise ValueError(f"[{mod_key}] menu.register.{l1}[] href 必须以 / 开头：{it['href']!r}")
+            bucket.append(_norm_menu_item(it))
+        count += len(items)
+    return out, count
+
+def _collect_tabs(mod_key: str, data: Any) -> Tuple[Dict[str, List[dict]], int]:
+    if not isinstance(data, dict):
+        raise ValueError(f"[{mod_key}] tabs.register.yaml 必须为对象：/base → tabs[]")
+    out: Dict[str, List[dict]] = {}
+    count = 0
+    for base, items in data.items():
+        if not isinstance(base, str) or not base.startswith("/"):
+            raise ValueError(f"[{mod_key}] tabs.register key 必须以 / 开头：{base!r}")
+        if not isinstance(items, list):
+            raise ValueError(f"[{mod_key}] tabs.register.{base} 必须为数组")
+        bucket = out.setdefault(base, [])
+        for it in items:
+            if not isinstance(it, dict):
+                raise ValueError(f"[{mod_key}] tabs.register.{base}[] 必须为对象")
+            for k in ("key", "text", "href"):
+                if k not in it or not isinstance(it[k], str) or not it[k].strip():
+                    raise ValueError(f"[{mod_key}] tabs.register.{base}[] 缺少/非法字段：{k}")
+            if not str(it["href"]).startswith("/"):
+                raise ValueError(f"[{mod_key}] tabs.register.{base}[] href 必须以 / 开头：{it['href']!r}")
+            bucket.append(_norm_tab_item(it))
+        count += len(items)
+    return out, count
+
+def _merge(contribs: List[Dict[str, Any]]) -> Tuple[Dict[str, List[dict]], Dict[str, List[dict]]]:
+    """按模块扫描顺序拼接 → 先到先得去重 → 稳定排序（与旧版逐模块去重/排序结果一致）。"""
     menu: Dict[str, List[dict]] = {}
     tabs: Dict[str, List[dict]] = {}
-    stats = {"modules": 0, "menus": 0, "tabs": 0}
+    for c in contribs:
+        for l1, items in c["menu"].items():
+            menu.setdefault(l1, []).extend(items)
+        for base, items in c["tabs"].items():
+            tabs.setdefault(base, []).extend(items)
+    for l1, bucket in menu.items():
+        dedup, seen = [], set()
+        for x in bucket:
+            if x["href"] in seen: continue
+            seen.add(x["href"]); dedup.append(x)
+        _sorted_inplace(dedup, "text")
+        menu[l1] = dedup
+    for base, bucket in tabs.items():
+        dedup, seen_k, seen_h = [], set(), set()
+        for x in bucket:
+            if x["key"] in seen_k or x["href"] in seen_h: continue
+            seen_k.add(x["key"]); seen_h.add(x["href"]); dedup.append(x)
+        _sorted_inplace(dedup, "text")
+        tabs[base] = dedup
+    return menu, tabs
 
-    for cfg_dir in MODULES_DIR.glob("**/config"):
-        mod_root = cfg_dir.parent
-        mod_key  = mod_root.relative_to(BASE_DIR).as_posix()
-
-        # ---- menu.register.yaml ----
-        mfile = cfg_dir / "menu.register.yaml"
-        if mfile.exists():
-            data = _read_yaml(mfile)
-            if not isinstance(data, dict):
-                raise ValueError(f"[{mod_key}] menu.register.yaml 必须为对象：L1 → items[]")
-            for l1, items in data.items():
-                if not isinstance(l1, str) or not l1.strip():
-                    raise ValueError(f"[{mod_key}] menu.register L1（键）必须为非空字符串")
-                if not isinstance(items, list):
-                    raise ValueError(f"[{mod_key}] menu.register.{l1} 必须为数组")
-                bucket = menu.setdefault(l1, [])
-                for it in items:
-                    if not isinstance(it, dict):
-                        raise ValueError(f"[{mod_key}] menu.register.{l1}[] 必须为对象")
-                    for k in ("text", "href"):
-                        if k not in it or not isinstance(it[k], str) or not it[k].strip():
-                            raise ValueError(f"[{mod_key}] menu.register.{l1}[] 缺少/非法字段：{k}")
-                    if not str(it["href"]).startswith("/"):
-                        raise ValueError(f"[{mod_key}] menu.register.{l1}[] href 必须以 / 开头：{it['href']!r}")
-                    bucket.append(_norm_menu_item(it))
-                # 去重（按 href）
-                dedup, seen = [], set()
-                for x in bucket:
-                    if x["href"] in seen: continue
-                    seen.add(x["href"]); dedup.append(x)
-                menu[l1] = dedup
-                _sorted_inplace(menu[l1], "text")
-                stats["menus"] += len(items)
-
-        # ---- tabs.register.yaml ----
-        tfile = cfg_dir / "tabs.register.yaml"
-        if tfile.exists():
-            data = _read_yaml(tfile)
-            if not isinstance(data, dict):
-                raise ValueError(f"[{mod_key}] tabs.register.yaml 必须为对象：/base → tabs[]")
-            for base, items in data.items():
-                if not isinstance(base, str) or not base.startswith("/"):
-                    raise ValueError(f"[{mod_key}] tabs.register key 必须以 / 开头：{base!r}")
-                if not isinstance(items, list):
-                    raise ValueError(f"[{mod_key}] tabs.register.{base} 必须为数组")
-                bucket = tabs.setdefault(base, [])
-                for it in items:
-                    if not isinstance(it, dict):
-                        raise ValueError(f"[{mod_key}] tabs.register.{base}[] 必须为对象")
-                    for k in ("key", "text", "href"):
-                        if k not in it or not isinstance(it[k], str) or not it[k].strip():
-                            raise ValueError(f"[{mod_key}] tabs.register.{base}[] 缺少/非法字段：{k}")
-                    if not str(it["href"]).startswith("/"):
-                        raise ValueError(f"[{mod_key}] tabs.register.{base}[] href 必须以 / 开头：{it['href']!r}")
-                    bucket.append(_norm_tab_item(it))
-                # 去重（按 key / href）
-                dedup, seen_k, seen_h = [], set(), set()
-                for x in bucket:
-                    if x["key"] in seen_k or x["href"] in seen_h: continue
-                    seen_k.add(x["key"]); seen_h.add(x["href"]); dedup.append(x)
-                tabs[base] = dedup
-                _sorted_inplace(tabs[base], "text")
-                stats["tabs"] += len(items)
-
-        stats["modules"] += 1
+def rebuild_nav(write_cache: bool = True, parallel: bool = False) -> Dict[str, Any]:
+    """
+    增量聚合：只重新解析内容变化的 register 文件，按模块合并。
+    额外返回 changed（本次新增/变更/移除的模块 key 列表，已排序）。
+    parallel=True 仅供命令行重建：待解析内容足够大时用进程池（服务进程内每个 worker 各起一池得不偿失）。
+    """
+    t0 = time.perf_counter()
+    nav = _rebuild_nav(write_cache, parallel)
+    NAV_REBUILD_SECONDS.observe(time.perf_counter() - t0)
+    for k, v in nav["stats"].items():
+        if isinstance(v, (int, float)):
+            NAV_STATS.set(v, k)
+    NAV_STATS.set(len(nav["changed"]), "changed")
+    return nav
+
+def _rebuild_nav(write_cache: bool, parallel: bool) -> Dict[str, Any]:
+    global _FILE_CACHE, _MODULE_CACHE
+    with _BUILD_LOCK:
+        file_cache = dict(_FILE_CACHE)
+        module_cache: Dict[str, Tuple[Tuple[Optional[str], Optional[str]], Dict[str, Any]]] = {}
+        contribs: List[Dict[str, Any]] = []
+        changed: List[str] = []
+        fp_entries: List[Tuple[str, Optional[str], Optional[str]]] = []
+        cfg_dirs = list(MODULES_DIR.glob("**/config"))
+        parse_ms, workers = _preparse([d / name for d in cfg_dirs for name in REGISTER_FILES], file_cache, parallel)
+        stats: Dict[str, Any] = {"modules": 0, "menus": 0, "tabs": 0, "parsed": len(parse_ms)}
+
+        for cfg_dir in cfg_dirs:
+            mod_root = cfg_dir.parent
+            mod_key  = mod_root.relative_to(BASE_DIR).as_posix()
+
+            m_fp, m_data, m_parsed = _load_yaml_cached(cfg_dir / "menu.register.yaml", file_cache)
+            t_fp, t_data, t_parsed = _load_yaml_cached(cfg_dir / "tabs.register.yaml", file_cache)
+            stats["parsed"] += int(m_parsed) + int(t_parsed)
+            fp_entries.append((mod_key, m_fp, t_fp))
+
+            prev = _MODULE_CACHE.get(mod_key)
+            if prev and prev[0] == (m_fp, t_fp):
+                contrib = prev[1]
+            else:
+                m_items, m_count = _collect_menu(mod_key, m_data) if m_fp is not None else ({}, 0)
+                t_items, t_count = _collect_tabs(mod_key, t_data) if t_fp is not None else ({}, 0)
+                contrib = {"menu": m_items, "tabs": t_items, "menus": m_count, "tabs_count": t_count}
+                if not prev or prev[1] != contrib:  # 仅格式/注释变化不算变更
+                    changed.append(mod_key)
+            module_cache[mod_key] = ((m_fp, t_fp), contrib)
+            contribs.append(contrib)
+            stats["menus"] += contrib["menus"]
+            stats["tabs"]  += contrib["tabs_count"]
+            stats["modules"] += 1
+
+        changed.extend(k for k in _MODULE_CACHE if k not in module_cache)
+        # 清理已删除模块的文件缓存条目
+        live = {str(BASE_DIR / k / "config" / f) for k in module_cache for f in REGISTER_FILES}
+        file_cache = {k: v for k, v in file_cache.items() if k in live}
+
+        stats["parse_workers"] = workers
+        stats["parse_ms"] = parse_ms
+        menu, tabs = _merge(contribs)
+        templates = discover_templates()
+        routes = _build_route_index(tabs, templates)
+
+        # 全部成功后再整体替换缓存，失败时保留上一代
+        _FILE_CACHE, _MODULE_CACHE = file_cache, module_cache
 
     now = datetime.now(timezone.utc).isoformat()
     digest_src = json.dumps({"menu": menu, "tabs": tabs}, ensure_ascii=False, sort_keys=True)
     sha = hashlib.sha1(digest_src.encode("utf-8")).hexdigest()[:16]
-    return { "menu": menu, "tabs": tabs, "generated_at": now, "hash": sha, "stats": stats }
+    nav = {
+        "menu": menu, "tabs": tabs, "routes": routes, "generated_at": now, "hash": sha,
+        "stats": stats, "changed": sorted(changed),
+    }
+    if write_cache:
+        _write_snapshot(nav, _combine_fingerprint(fp_entries, templates))
+    return nav
+
+# ---- 持久化快照（跨 worker 共享，冷启动免解析）----
+def cache_dir() -> Path:
+    """导航快照/代号文件所在目录（多 worker、多容器共享时指向同一卷）。"""
+    return Path(settings.NAV_CACHE_DIR) if settings.NAV_CACHE_DIR else Path(tempfile.gettempdir()) / "minipost"
+
+def _snapshot_path() -> Path:
+    return cache_dir() / "nav.snapshot.json"
+
+def _combine_fingerprint(entries: List[Tuple[str, Optional[str], Optional[str]]], templates: List[str]) -> str:
+    h = hashlib.sha1(f"v{SNAPSHOT_VERSION}".encode("utf-8"))
+    for mod_key, m_fp, t_fp in entries:
+        h.update(f"\n{mod_key}\0{m_fp or '-'}\0{t_fp or '-'}".encode("utf-8"))
+    for t in templates:
+        h.update(f"\nT{t}".encode("utf-8"))
+    return h.hexdigest()
+
+def nav_fingerprint() -> str:
+    """只读文件字节算 sha1（不解析 YAML），与 rebuild_nav 写快照时的指纹口径一致。"""
+    entries: List[Tuple[str, Optional[str], Optional[str]]] = []
+    for cfg_dir in MODULES_DIR.glob("**/config"):
+        mod_key = cfg_dir.parent.relative_to(BASE_DIR).as_posix()
+        fps: List[Optional[str]] = []
+        for name in REGISTER_FILES:
+            try:
+                fps.append(hashlib.sha1((cfg_dir / name).read_bytes()).hexdigest())
+            except FileNotFoundError:
+                fps.append(None)
+        entries.append((mod_key, fps[0], fps[1]))
+    return _combine_fingerprint(entries, discover_templates())
+
+def _write_snapshot(nav: Dict[str, Any], fingerprint: str) -> None:
+    path = _snapshot_path()
+    body = {"version": SNAPSHOT_VERSION, "fingerprint": fingerprint,
+            "nav": {k: v for k, v in nav.items() if k != "changed"}}
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".nav.", suffix=".tmp", dir=str(path.parent))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(body, f, ensure_ascii=False, separators=(",", ":"))
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)  # 原子替换，其它 worker 不会读到半截文件
+    except OSError as e:
+        logger.warning("导航快照写入失败（%s）：%s", path, e)
+
+def load_nav_snapshot(fingerprint: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """指纹一致时返回快照中的导航；版本/指纹不符或文件损坏返回 None。"""
+    path = _snapshot_path()
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            body = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(body, dict) or body.get("version") != SNAPSHOT_VERSION:
+        return None
+    if body.get("fingerprint") != (fingerprint or nav_fingerprint()):
+        return None
+    nav = body.get("nav")
+    if not isinstance(nav, dict):
+        return None
+    nav["changed"] = []
+    stats = nav.setdefault("stats", {})
+    stats.update(parsed=0, parse_workers=0, parse_ms={})
+    return nav
+
+def load_nav(write_cache: bool = True) -> Dict[str, Any]:
+    """启动路径：优先用快照，指纹变化时才完整 rebuild_nav（并刷新快照）。"""
+    nav = load_nav_snapshot()
+    if nav is not None:
+        return nav
+    return rebuild_nav(write_cache=write_cache)
@@ -0,0 +1,172 @@
+# app/services/nav_watcher.py
+# -*- coding: utf-8 -*-
+"""
+导航热重载监视器（可选，Settings.NAV_WATCH 开启）
+
+- 监视：modules/**/config/*.register.yaml 与 modules/**/frontend/templates/*.html
+  （permissions.register 变化时顺带同步权限表）
+- 后端：优先 watchfiles（inotify/FSEvents），未安装时退回轮询（只 stat，不读内容）
+- 防抖：一批改动静默 NAV_WATCH_DEBOUNCE 秒后才触发一次 refresh_nav_cache()
+  （增量重建 + 路由索引 + 快照 + 跨 worker 代号），git pull 改 50 个模块也只重载一次
+- 多 worker：通过 cache_dir() 下的文件锁只让一个进程监视，其它 worker 经代号文件同步
+"""
+from __future__ import annotations
+from typing import Dict, Optional, Set, Tuple
+import logging, threading, time
+
+try:
+    import fcntl  # type: ignore
+except Exception:  # pragma: no cover - 非 POSIX
+    fcntl = None
+
+try:
+    import watchfiles  # type: ignore
+except Exception:  # pragma: no cover - 可选依赖
+    watchfiles = None
+
+from app.settings import settings
+from app.services.nav_loader import MODULES_DIR, cache_dir
+
+logger = logging.getLogger("minipost")
+
+def _is_watched(path: str) -> bool:
+    p = path.replace("\\", "/")
+    if p.endswith(".register.yaml"):
+        return "/config/" in p
+    if p.endswith(".html"):
+        return "/frontend/templates/" in p
+    return False
+
+def _scan() -> Dict[str, Tuple[int, int]]:
+    """轮询模式的目录签名：{path: (mtime_ns, size)}。"""
+    sig: Dict[str, Tuple[int, int]] = {}
+    for pattern in ("**/config/*.register.yaml", "**/frontend/templates/*.html"):
+        for p in MODULES_DIR.glob(pattern):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            sig[str(p)] = (st.st_mtime_ns, st.st_size)
+    return sig
+
+class NavWatcher:
+    def __init__(self, interval: float, debounce: float):
+        self.interval = max(0.1, interval)
+        self.debounce = max(0.0, debounce)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock_fd = None
+        self.reloads = 0
+
+    # ---- 生命周期 ----
+    def start(self) -> bool:
+        if self._thread is not None:
+            return True
+        if not self._acquire_leader():
+            logger.info("导航监视器：其它进程已在监视，本 worker 跳过")
+            return False
+        self._thread = threading.Thread(target=self._run, name="nav-watcher", daemon=True)
+        self._thread.start()
+        logger.info("导航监视器已启动（%s）", "watchfiles" if watchfiles is not None else "polling")
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + self.debounce + 1)
+            self._thread = None
+        if self._lock_fd is not None:
+            self._lock_fd.close()
+            self._lock_fd = None
+
+    def _acquire_leader(self) -> bool:
+        if fcntl is None:
+            return True
+        try:
+            d = cache_dir()
+            d.mkdir(parents=True, exist_ok=True)
+            fd = open(d / "nav.watch.lock", "a")
+        except OSError as e:
+            logger.warning("导航监视器锁文件不可用，直接启动：%s", e)
+            return True
+        try:
+            fcntl.flock(fd.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fd.close()
+            return False
+        self._lock_fd = fd
+        return True
+
+    # ---- 主循环 ----
+    def _run(self) -> None:
+        try:
+            if watchfiles is not None:
+                self._run_watchfiles()
+            else:
+                self._run_polling()
+        except Exception as e:
+            logger.exception("导航监视器异常退出：%s", e)
+
+    def _run_watchfiles(self) -> None:
+        # watchfiles：静默 step 毫秒后把这批改动一起交出（单批最长 debounce 毫秒）
+        step = int(max(self.debounce, 0.05) * 1000)
+        for changes in watchfiles.watch(
+            MODULES_DIR,
+            watch_filter=lambda _change, path: _is_watched(path),
+            debounce=max(1600, step * 10),
+            step=step,
+            stop_event=self._stop,
+            yield_on_timeout=False,
+        ):
+            if changes:
+                self._reload(len(changes))
+
+    def _run_polling(self) -> None:
+        last = _scan()
+        pending: Set[str] = set()
+        last_change = 0.0
+        while not self._stop.wait(self.interval):
+            cur = _scan()
+            if cur != last:
+                pending |= {k for k in cur.keys() | last.keys() if cur.get(k) != last.get(k)}
+                last, last_change = cur, time.monotonic()
+                continue
+            if pending and time.monotonic() - last_change >= self.debounce:
+                self._reload(len(pending))
+                pending = set()
+
+    def _reload(self, n_changes: int) -> None:
+        from app.common.utils import refresh_nav_cache  # 避免循环导入
+        t0 = time.perf_counter()
+        r = refresh_nav_cache()
+        self.reloads += 1
+        if r.get("ok"):
+            logger.info("导航热重载：%d 处改动 → 变更模块 %s（%.1f ms）",
+                        n_changes, r.get("changed") or [], (time.perf_counter() - t0) * 1000)
+        else:
+            logger.warning("导航热重载失败，继续沿用上一代：%s", r.get("errors"))
+        try:
+            from app.services.permission_registry import sync_permissions
+            sync_permissions()
+        except Exception as e:
+            logger.warning("权限注册表同步失败：%s", e)
+
+_WATCHER: Optional[NavWatcher] = None
+
+def start_nav_watcher() -> Optional[NavWatcher]:
+    """按配置启动（幂等）；NAV_WATCH 关闭时返回 None。"""
+    global _WATCHER
+    if not settings.NAV_WATCH:
+        return None
+    if _WATCHER is None:
+        w = NavWatcher(settings.NAV_WATCH_INTERVAL, settings.NAV_WATCH_DEBOUNCE)
+        if not w.start():
+            return None
+        _WATCHER = w
+    return _WATCHER
+
+def stop_nav_watcher() -> None:
+    global _WATCHER
+    if _WATCHER is not None:
+        _WATCHER.stop()
+        _WATCHER = None
@@ -0,0 +1,200 @@
+# app/services/permission_registry.py
+# -*- coding: utf-8 -*-
+"""
+权限注册表同步（modules/**/config/permissions.register.yaml → permission 表）
+
+- Schema：
+    kind: permissions.register
+    permissions:
+      - {key: "orders:view", name: "查看订单"}
+      - "orders:export"            # 简写：name 同 key
+- 聚合：按模块路径排序扫描，同一 key 先到先得；文件解析沿用 nav_loader 的增量文件缓存
+- 同步：一次查询读出已存在的 key/name，缺失的集合式插入、名称变化的批量更新；不删除表中多出的权限
+- 跳过：register 文件字节指纹、目标库、库内 permission(key, name) 校验和三者都与
+  <NAV_CACHE_DIR>/permissions.synced.json 一致时不解析 YAML、不写库（只读一次 permission 表算校验和）；
+  库被恢复/重置后校验和变化，自动重新同步。多 worker 经文件锁串行，后到者重读标记后直接跳过
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib, json, logging, os, tempfile, threading
+
+try:
+    import fcntl  # type: ignore
+except Exception:  # pragma: no cover - 非 POSIX
+    fcntl = None
+
+from sqlalchemy import bindparam, select, update
+
+from app.settings import settings
+from app.services.nav_loader import BASE_DIR, MODULES_DIR, cache_dir, _load_yaml_cached
+
+logger = logging.getLogger("minipost")
+
+REGISTER_FILE = "permissions.register.yaml"
+MARKER_VERSION = 2
+
+_FILE_CACHE: Dict[str, Tuple[int, int, str, Any]] = {}
+_SYNC_LOCK = threading.Lock()
+
+def _register_files() -> List[Tuple[str, Path]]:
+    return sorted(
+        (p.parent.parent.relative_to(BASE_DIR).as_posix(), p)
+        for p in MODULES_DIR.glob(f"**/config/{REGISTER_FILE}")
+    )
+
+def permissions_fingerprint() -> str:
+    """只读文件字节（不解析 YAML）。"""
+    h = hashlib.sha1(f"v{MARKER_VERSION}".encode("utf-8"))
+    for mod_key, p in _register_files():
+        try:
+            h.update(f"\n{mod_key}\0{hashlib.sha1(p.read_bytes()).hexdigest()}".encode("utf-8"))
+        except FileNotFoundError:
+            continue
+    return h.hexdigest()
+
+def _collect(mod_key: str, data: Any) -> List[Tuple[str, str]]:
+    if not isinstance(data, dict):
+        raise ValueError(f"[{mod_key}] {REGISTER_FILE} 必须为对象")
+    items = data.get("permissions") or []
+    if not isinstance(items, list):
+        raise ValueError(f"[{mod_key}] {REGISTER_FILE}.permissions 必须为数组")
+    out: List[Tuple[str, str]] = []
+    for it in items:
+        if isinstance(it, str):
+            it = {"key": it}
+        if not isinstance(it, dict) or not isinstance(it.get("key"), str) or not it["key"].strip():
+            raise ValueError(f"[{mod_key}] {REGISTER_FILE}.permissions[] 缺少/非法字段：key")
+        key = it["key"].strip()
+        name = it.get("name")
+        out.append((key, name.strip() if isinstance(name, str) and name.strip() else key))
+    return out
+
+def collect_permissions() -> Dict[str, Any]:
+    """聚合全部模块声明的权限：{permissions: {key: name}, modules, parsed}。"""
+    global _FILE_CACHE
+    file_cache = dict(_FILE_CACHE)
+    perms: Dict[str, str] = {}
+    modules = parsed = 0
+    live = set()
+    for mod_key, p in _register_files():
+        fp, data, reparsed = _load_yaml_cached(p, file_cache)
+        if fp is None:
+            continue
+        live.add(str(p))
+        modules += 1
+        parsed += int(reparsed)
+        for key, name in _collect(mod_key, data):
+            perms.setdefault(key, name)
+    _FILE_CACHE = {k: v for k, v in file_cache.items() if k in live}
+    return {"permissions": perms, "modules": modules, "parsed": parsed}
+
+# ---- 同步标记（按目标库区分）----
+def _db_identity() -> str:
+    from app.db import engine
+    return hashlib.sha1(engine.url.render_as_string(hide_password=True).encode("utf-8")).hexdigest()[:16]
+
+def _db_state() -> str:
+    """permission 表当前内容的校验和（按 key 排序的 key/name）。"""
+    from app.db import SessionLocal
+    from modules.core.backend.models.rbac import Permission
+    h = hashlib.sha1()
+    with SessionLocal() as db:
+        for key, name in db.execute(select(Permission.key, Permission.name).order_by(Permission.key)):
+            h.update(f"{key}\0{name}\n".encode("utf-8"))
+    return h.hexdigest()
+
+def _marker_path() -> Path:
+    return cache_dir() / "permissions.synced.json"
+
+def _read_marker() -> Optional[Dict[str, Any]]:
+    try:
+        with _marker_path().open("r", encoding="utf-8") as f:
+            body = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return body if isinstance(body, dict) else None
+
+def _write_marker(fingerprint: str, db_id: str, state: str) -> None:
+    path = _marker_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".perms.", suffix=".tmp", dir=str(path.parent))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": MARKER_VERSION, "fingerprint": fingerprint, "db": db_id, "state": state}, f)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("权限同步标记写入失败（%s）：%s", path, e)
+
+def _is_synced(fingerprint: str, db_id: str, state: str) -> bool:
+    m = _read_marker()
+    return (bool(m) and m.get("version") == MARKER_VERSION and m.get("fingerprint") == fingerprint
+            and m.get("db") == db_id and m.get("state") == state)
+
+class _FileLock:
+    """跨 worker 串行（非 POSIX 或目录不可写时退化为仅进程内锁）。"""
+
+    def __init__(self, name: str):
+        self.path = cache_dir() / name
+        self._fd = None
+
+    def __enter__(self) -> "_FileLock":
+        if fcntl is None:
+            return self
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = open(self.path, "a+")
+            fcntl.flock(self._fd.fileno(), fcntl.LOCK_EX)
+        except OSError as e:
+            logger.warning("权限同步文件锁不可用（%s）：%s", self.path, e)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._fd is not None:
+            self._fd.close()
+            self._fd = None
+
+def _apply(declared: Dict[str, str]) -> Dict[str, int]:
+    from app.db import SessionLocal
+    from modules.core.backend.models.rbac import Permission
+    from modules.core.backend.services.rbac import insert_ignore, bump_rbac_generation
+
+    keys = sorted(declared)
+    size = max(1, settings.RBAC_BULK_BATCH)
+    with SessionLocal() as db:
+        existing: Dict[str, str] = {}
+        for i in range(0, len(keys), size):
+            existing.update(db.execute(select(Permission.key, Permission.name).where(Permission.key.in_(keys[i:i + size]))).tuples().all())
+        inserted = insert_ignore(db, Permission, ({"key": k, "name": declared[k]} for k in keys if k not in existing))
+        renamed = [{"k": k, "n": declared[k]} for k in keys if k in existing and existing[k] != declared[k]]
+        if renamed:
+            db.execute(
+                update(Permission.__table__).where(Permission.__table__.c.key == bindparam("k")).values(name=bindparam("n")),
+                renamed,
+            )
+        db.commit()
+    if inserted or renamed:
+        bump_rbac_generation()
+    return {"inserted": inserted, "updated": len(renamed)}
+
+def sync_permissions(force: bool = False) -> Dict[str, Any]:
+    """
+    把各模块声明的权限同步进 permission 表（幂等）。
+    指纹、目标库与库内权限校验和都与同步标记一致时直接返回 skipped=True（不解析 YAML、不写库）。
+    """
+    fingerprint = permissions_fingerprint()
+    db_id = _db_identity()
+    if not force and _is_synced(fingerprint, db_id, _db_state()):
+        return {"ok": True, "skipped": True, "fingerprint": fingerprint}
+    with _SYNC_LOCK, _FileLock("permissions.sync.lock"):
+        if not force and _is_synced(fingerprint, db_id, _db_state()):  # 其它 worker 刚同步完
+            return {"ok": True, "skipped": True, "fingerprint": fingerprint}
+        agg = collect_permissions()
+        r = _apply(agg["permissions"])
+        _write_marker(fingerprint, db_id, _db_state())
+    logger.info("权限注册表同步：声明 %d 个，新增 %d，改名 %d", len(agg["permissions"]), r["inserted"], r["updated"])
+    return {
+        "ok": True, "skipped": False, "fingerprint": fingerprint,
+        "declared": len(agg["permissions"]), "modules": agg["modules"], "parsed": agg["parsed"], **r,
+    }
@@ -0,0 +1,111 @@
+# app/services/readiness.py
+# -*- coding: utf-8 -*-
+"""
+就绪探测（/readyz）
+
+- 后台线程每 READY_CHECK_SECONDS 秒跑一次各组件检查（DB SELECT 1、导航快照），结果带时间戳缓存
+- /readyz 只读内存结果，不取连接池连接、不做 I/O；负载均衡/compose 高频轮询也不占业务连接
+- 结果超过 READY_STALE_SECONDS 未刷新（检查线程卡死/DB 超时）视为未就绪
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, Optional
+import logging, threading, time
+
+from sqlalchemy import text
+
+from app.settings import settings
+
+logger = logging.getLogger("minipost")
+
+def _check_db() -> Dict[str, Any]:
+    from app.db import engine
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return {}
+
+def _check_nav() -> Dict[str, Any]:
+    from app.common.utils import get_nav_snapshot
+    snap = get_nav_snapshot()
+    stats = snap.nav.get("stats") or {}
+    if snap.generation == 0:
+        raise RuntimeError("导航尚未加载")
+    return {
+        "generation": snap.generation,
+        "hash": snap.hash,
+        "built_at": snap.ts,
+        "modules": stats.get("modules", 0),
+        "menus": len(snap.menu),
+        "tabs": sum(len(v) for v in snap.tabs.values()),
+        "routes": len(snap.routes),
+    }
+
+CHECKS: Dict[str, Callable[[], Dict[str, Any]]] = {
+    "db": _check_db,
+    "nav": _check_nav,
+}
+
+class Readiness:
+    def __init__(self, interval: float, stale_after: float):
+        self.interval = max(0.5, interval)
+        self.stale_after = max(self.interval * 2, stale_after)
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check_once(self) -> None:
+        results: Dict[str, Dict[str, Any]] = {}
+        for name, fn in CHECKS.items():
+            t0 = time.perf_counter()
+            try:
+                detail = fn()
+                r: Dict[str, Any] = {"ok": True, **detail}
+            except Exception as e:
+                r = {"ok": False, "error": f"{type(e).__name__}: {e}"[:300]}
+            prev = self._results.get(name)
+            if prev is not None and prev["ok"] and not r["ok"]:
+                logger.warning("就绪检查 %s 失败：%s", name, r["error"])
+            r["latency_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+            r["checked_at"] = time.time()
+            results[name] = r
+        # 整体替换引用，读方无锁
+        self._results = results
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.check_once()
+            except Exception:
+                logger.exception("就绪检查异常")
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="readiness", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def status(self) -> Dict[str, Any]:
+        """从内存组装探测结果（不做 I/O）。"""
+        now = time.time()
+        results = self._results
+        components: Dict[str, Dict[str, Any]] = {}
+        ok = bool(results)
+        for name, r in results.items():
+            c = dict(r)
+            c["age_seconds"] = round(now - r["checked_at"], 3)
+            if c["age_seconds"] > self.stale_after:
+                c["ok"], c["stale"] = False, True
+            if name == "nav" and r.get("built_at"):
+                c["nav_age_seconds"] = round(now - r["built_at"], 3)
+            ok = ok and c["ok"]
+            components[name] = c
+        return {"ok": ok, "components": components} if results else {"ok": False, "status": "starting", "components": {}}
+
+readiness = Readiness(settings.READY_CHECK_SECONDS, settings.READY_STALE_SECONDS)
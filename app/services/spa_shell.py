@@ -0,0 +1,137 @@
+# app/services/spa_shell.py
+# -*- coding: utf-8 -*-
+"""
+SPA 壳层（index.html）内存缓存
+
+- 候选路径只在启动/文件变化时解析一次；字节、gzip/br 变体、ETag、Last-Modified 常驻内存
+- 每 SPA_SHELL_CHECK_SECONDS 秒最多 stat 一次当前文件，变化才重新读取（<=0 则只在首次加载）
+- /、通用 L3 回落与 /login 共用同一份
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import hashlib, os, threading, time
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.settings import settings
+from app.common.http_cache import compress_variants, pick_encoding, etag_matches
+
+# 构建产物优先；最后一项是开发兜底（Vite 源 index.html）
+CANDIDATES = (
+    "/app/static/assets/index.html",  # Docker 镜像内路径
+    "static/assets/index.html",       # 本地运行
+    "/app/static/index.html",
+    "static/index.html",
+)
+DEV_FALLBACK = "index.html"
+
+@dataclass(frozen=True)
+class ShellFile:
+    path: str
+    stamp: Tuple[int, int, int]           # (mtime_ns, size, ino)
+    variants: Dict[str, bytes]
+    etag: str
+    last_modified: str
+    mtime: int                            # 秒，供 If-Modified-Since 比较
+    dev_fallback: bool
+
+    def response(self, request: Request) -> Response:
+        headers = {
+            "ETag": self.etag,
+            "Last-Modified": self.last_modified,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        inm = request.headers.get("if-none-match")
+        if inm is not None:
+            if etag_matches(inm, self.etag):
+                return Response(status_code=304, headers=headers)
+        elif _not_modified_since(request.headers.get("if-modified-since"), self.mtime):
+            return Response(status_code=304, headers=headers)
+        enc = pick_encoding(request.headers.get("accept-encoding"), self.variants)
+        if enc != "identity":
+            headers["Content-Encoding"] = enc
+        return Response(content=self.variants[enc], media_type="text/html; charset=utf-8", headers=headers)
+
+def _not_modified_since(value: Optional[str], mtime: int) -> bool:
+    if not value:
+        return False
+    try:
+        return int(parsedate_to_datetime(value).timestamp()) >= mtime
+    except (TypeError, ValueError):
+        return False
+
+def _stamp(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+class SpaShell:
+    def __init__(self, check_seconds: float):
+        self.check_seconds = check_seconds
+        self._current: Optional[ShellFile] = None
+        self._resolved = False
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self, path: str, stamp: Tuple[int, int, int]) -> ShellFile:
+        body = Path(path).read_bytes()
+        mtime = stamp[0] // 1_000_000_000
+        return ShellFile(
+            path=path,
+            stamp=stamp,
+            variants=compress_variants(body),
+            etag=f'W/"{hashlib.sha1(body).hexdigest()[:16]}"',
+            last_modified=formatdate(mtime, usegmt=True),
+            mtime=mtime,
+            dev_fallback=(path == DEV_FALLBACK),
+        )
+
+    def _resolve(self) -> Optional[ShellFile]:
+        for p in CANDIDATES + (DEV_FALLBACK,):
+            stamp = _stamp(p)
+            if stamp is not None:
+                try:
+                    return self._load(p, stamp)
+                except OSError:
+                    continue
+        return None
+
+    def _refresh(self) -> None:
+        cur = self._current
+        if cur is not None:
+            # 当前是开发兜底时，构建产物一旦出现就切换过去
+            if cur.dev_fallback and any(_stamp(p) is not None for p in CANDIDATES):
+                self._current = self._resolve()
+                return
+            stamp = _stamp(cur.path)
+            if stamp == cur.stamp:
+                return
+            if stamp is not None:
+                try:
+                    self._current = self._load(cur.path, stamp)
+                    return
+                except OSError:
+                    pass
+        # 首次或文件消失：重新按候选顺序解析
+        self._current = self._resolve()
+
+    def current(self) -> Optional[ShellFile]:
+        """返回当前壳层；间隔内直接返回内存对象（无系统调用）。"""
+        now = time.monotonic()
+        if self._resolved and (self.check_seconds <= 0 or now < self._next_check):
+            return self._current
+        with self._lock:
+            if not self._resolved or (self.check_seconds > 0 and now >= self._next_check):
+                self._refresh()
+                self._resolved = True
+                self._next_check = now + self.check_seconds
+        return self._current
+
+spa_shell = SpaShell(settings.SPA_SHELL_CHECK_SECONDS)
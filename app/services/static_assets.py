@@ -0,0 +1,291 @@
+# app/services/static_assets.py
+# -*- coding: utf-8 -*-
+"""
+/static 静态资源（替代 StaticFiles）
+
+- 构建产物目录（static/assets/）下带内容 hash 的文件名（Vite name-XXXXXXXX.js/css/…，hash 段须含数字或大小写混合）：
+  Cache-Control: public, max-age=1 年, immutable；其它文件 no-cache + ETag/Last-Modified 协商
+- 预压缩旁路文件：优先用构建期生成的 <file>.br / <file>.gz（python -m app.services.static_assets <dir>）；
+  没有时首个请求触发后台压缩，写到 <NAV_CACHE_DIR>/static/，就绪前先发原文件；压缩变体的 ETag 带 -br/-gz 后缀
+- stat 缓存：规范化路径 → (原文件 stat, 各编码变体 stat)，每 STATIC_STAT_SECONDS 秒最多 stat 一次；
+  条目数有上限（CACHE_MAX_ENTRIES），客户端构造的路径变体不会无限占内存
+"""
+from __future__ import annotations
+from dataclasses import dataclass, replace
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+import gzip, hashlib, logging, mimetypes, os, posixpath, queue, re, stat, sys, threading, time
+
+try:
+    import brotli  # type: ignore
+except Exception:  # pragma: no cover - 可选依赖
+    brotli = None
+
+from starlette.responses import FileResponse, PlainTextResponse, Response
+
+from app.settings import settings
+from app.common.http_cache import pick_encoding, etag_matches
+
+logger = logging.getLogger("minipost")
+
+# Vite 默认 [name]-[hash:8].[ext]（hash 为 base64url 字符）；只认构建产物目录下的文件
+HASHED_NAME = re.compile(r"-([A-Za-z0-9_-]{8})\.[A-Za-z0-9]+$")
+IMMUTABLE_DIR = "assets/"
+CACHE_MAX_ENTRIES = 4096
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+SIDECARS = (("br", ".br"), ("gzip", ".gz"))
+ETAG_SUFFIX = {"br": "br", "gzip": "gz"}
+COMPRESS_MIN_SIZE = 1024
+_COMPRESSIBLE = ("text/", "application/javascript", "application/json", "application/xml",
+                 "image/svg+xml", "application/wasm", "application/manifest+json")
+
+def _hash_like(token: str) -> bool:
+    # 排除 my-override.css、theme-settings.css 这类普通单词
+    return any(c.isdigit() for c in token) or (token.lower() != token and token.upper() != token)
+
+def is_hashed(rel: str) -> bool:
+    """rel：相对静态根目录的 posix 路径。"""
+    if not rel.startswith(IMMUTABLE_DIR) or rel.endswith(".html"):
+        return False
+    m = HASHED_NAME.search(rel)
+    return m is not None and _hash_like(m.group(1))
+
+def _media_type(name: str) -> str:
+    if name.endswith((".js", ".mjs")):
+        return "application/javascript"
+    if name.endswith(".map"):
+        return "application/json"
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+def _compressible(name: str, size: int) -> bool:
+    return size >= COMPRESS_MIN_SIZE and (name.endswith(".map") or _media_type(name).startswith(_COMPRESSIBLE))
+
+def _stat(path: str) -> Optional[os.stat_result]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st if stat.S_ISREG(st.st_mode) else None
+
+@dataclass(frozen=True)
+class Asset:
+    path: str
+    stat: os.stat_result
+    media_type: str
+    etag: str
+    immutable: bool
+    variants: Dict[str, Tuple[str, os.stat_result]]   # encoding → (path, stat)
+    checked: float                                     # monotonic
+
+def _variant_ok(st: Optional[os.stat_result], orig: os.stat_result) -> bool:
+    return st is not None and st.st_mtime_ns >= orig.st_mtime_ns and st.st_size < orig.st_size
+
+class _Compressor:
+    """按需生成旁路压缩文件（单线程，同一文件只排队一次）。"""
+
+    def __init__(self) -> None:
+        self._q: "queue.Queue[Tuple[str, str]]" = queue.Queue()
+        self._inflight: Set[str] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.on_done = lambda path: None
+
+    def submit(self, path: str, target_base: str) -> None:
+        with self._lock:
+            if path in self._inflight:
+                return
+            self._inflight.add(path)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="static-compress", daemon=True)
+                self._thread.start()
+        self._q.put((path, target_base))
+
+    def _run(self) -> None:
+        while True:
+            path, base = self._q.get()
+            try:
+                write_sidecars(path, base)
+            except Exception as e:
+                logger.warning("静态资源压缩失败 %s：%s", path, e)
+            with self._lock:
+                self._inflight.discard(path)
+            try:
+                self.on_done(path)
+            except Exception:
+                # 回调异常不能让线程退出，否则之后的 submit 永远排队
+                logger.exception("静态资源压缩回调失败 %s", path)
+
+def write_sidecars(path: str, target_base: Optional[str] = None) -> int:
+    """为 path 生成 .br/.gz（target_base 为空时写在原文件旁）；原子替换，返回写出的个数。"""
+    body = Path(path).read_bytes()
+    base = target_base or path
+    Path(base).parent.mkdir(parents=True, exist_ok=True)
+    out = {".gz": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        out[".br"] = brotli.compress(body, quality=11)
+    n = 0
+    for suffix, data in out.items():
+        if len(data) >= len(body):
+            continue
+        tmp = f"{base}{suffix}.tmp{os.getpid()}"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, base + suffix)
+        n += 1
+    return n
+
+class StaticAssets:
+    """ASGI 应用，挂在 /static。"""
+
+    def __init__(self, directory: str, check_seconds: Optional[float] = None, compress_on_demand: Optional[bool] = None):
+        self.directory = os.path.realpath(directory)
+        self.check_seconds = settings.STATIC_STAT_SECONDS if check_seconds is None else check_seconds
+        self.compress_on_demand = settings.STATIC_COMPRESS_ON_DEMAND if compress_on_demand is None else compress_on_demand
+        self._cache: Dict[str, Asset] = {}
+        self._cache_lock = threading.Lock()  # 写 _cache 与压缩线程的失效扫描互斥；读（命中）不加锁
+        self._missing_at: Dict[str, float] = {}
+        self._attempted: Dict[str, int] = {}  # 已排队压缩过的文件 → 当时的 mtime_ns（压不小的不再重试）
+        self._compressor = _Compressor()
+        self._compressor.on_done = self._invalidate
+
+    # ---- 解析 + stat 缓存 ----
+    def _resolve(self, rel: str) -> Optional[str]:
+        full = os.path.realpath(os.path.join(self.directory, rel.lstrip("/")))
+        if full != self.directory and not full.startswith(self.directory + os.sep):
+            return None
+        return full
+
+    def _generated_base(self, full: str) -> str:
+        from app.services.nav_loader import cache_dir  # 仅按需压缩时才需要
+        rel = os.path.relpath(full, self.directory)
+        return str(cache_dir() / "static" / rel)
+
+    def _invalidate(self, full: str) -> None:
+        # 压缩完成（压缩线程调用）：让引用该文件的条目下次重建（少见路径，直接扫描）
+        with self._cache_lock:
+            for rel in [k for k, v in self._cache.items() if v.path == full]:
+                self._cache.pop(rel, None)
+
+    def _build(self, full: str, st: os.stat_result, now: float) -> Asset:
+        name = os.path.basename(full)
+        variants: Dict[str, Tuple[str, os.stat_result]] = {}
+        gen_base = None
+        for enc, suffix in SIDECARS:
+            vst = _stat(full + suffix)
+            if _variant_ok(vst, st):
+                variants[enc] = (full + suffix, vst)  # type: ignore[assignment]
+                continue
+            if gen_base is None:
+                gen_base = self._generated_base(full) if self.compress_on_demand else ""
+            if gen_base:
+                vst = _stat(gen_base + suffix)
+                if _variant_ok(vst, st):
+                    variants[enc] = (gen_base + suffix, vst)  # type: ignore[assignment]
+        if (self.compress_on_demand and not variants and _compressible(name, st.st_size)
+                and self._attempted.get(full) != st.st_mtime_ns):
+            self._attempted[full] = st.st_mtime_ns
+            self._compressor.submit(full, self._generated_base(full))
+        tag = hashlib.md5(f"{st.st_mtime_ns}-{st.st_size}".encode("utf-8")).hexdigest()
+        rel = os.path.relpath(full, self.directory).replace(os.sep, "/")
+        return Asset(
+            path=full, stat=st, media_type=_media_type(name), etag=f'"{tag}"',
+            immutable=is_hashed(rel), variants=variants, checked=now,
+        )
+
+    def lookup(self, rel: str) -> Optional[Asset]:
+        """按请求子路径查资源；缓存期内不做任何系统调用（含 realpath）。"""
+        rel = posixpath.normpath("/" + rel.lstrip("/"))  # /a/../x.js、//x.js、/./x.js 归为同一键
+        now = time.monotonic()
+        hit = self._cache.get(rel)
+        if hit is not None and now - hit.checked < self.check_seconds:
+            return hit
+        missing = self._missing_at.get(rel)
+        if hit is None and missing is not None and now - missing < self.check_seconds:
+            return None
+        full = self._resolve(rel)
+        st = _stat(full) if full is not None else None
+        if st is None or full is None:
+            with self._cache_lock:
+                self._cache.pop(rel, None)
+            if len(self._missing_at) >= CACHE_MAX_ENTRIES:
+                self._missing_at.clear()
+            self._missing_at[rel] = now
+            return None
+        self._missing_at.pop(rel, None)
+        if hit is not None and hit.path == full and (hit.stat.st_mtime_ns, hit.stat.st_size) == (st.st_mtime_ns, st.st_size):
+            # 内容未变：只刷新检查时间（变体不全时顺带重查旁路文件）
+            asset = self._build(full, st, now) if len(hit.variants) < len(SIDECARS) else replace(hit, checked=now)
+        else:
+            asset = self._build(full, st, now)
+        with self._cache_lock:
+            if hit is None and len(self._cache) >= CACHE_MAX_ENTRIES:
+                self._cache.clear()
+            self._cache[rel] = asset
+        return asset
+
+    # ---- ASGI ----
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        assert scope["type"] == "http"
+        method = scope["method"]
+        if method not in ("GET", "HEAD"):
+            await PlainTextResponse("Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})(scope, receive, send)
+            return
+        asset = self.lookup(_subpath(scope))
+        if asset is None:
+            await PlainTextResponse("Not Found", status_code=404)(scope, receive, send)
+            return
+        await self.response(asset, scope)(scope, receive, send)
+
+    def response(self, asset: Asset, scope: Dict[str, Any]) -> Response:
+        headers = {h.decode("latin-1").lower(): v.decode("latin-1") for h, v in scope["headers"]}
+        enc = pick_encoding(headers.get("accept-encoding"), asset.variants)
+        # 每种编码是不同的字节表示，各用自己的强 ETag
+        etag = asset.etag if enc == "identity" else f'{asset.etag[:-1]}-{ETAG_SUFFIX[enc]}"'
+        resp_headers = {
+            "ETag": etag,
+            "Cache-Control": IMMUTABLE if asset.immutable else REVALIDATE,
+        }
+        if asset.variants:
+            resp_headers["Vary"] = "Accept-Encoding"
+        inm = headers.get("if-none-match")
+        if (inm is not None and etag_matches(inm, etag)) or (inm is None and _not_modified_since(headers.get("if-modified-since"), asset.stat)):
+            return Response(status_code=304, headers=resp_headers)
+        path, st = asset.path, asset.stat
+        if enc != "identity":
+            path, st = asset.variants[enc]
+            resp_headers["Content-Encoding"] = enc
+        return FileResponse(path, headers=resp_headers, media_type=asset.media_type, stat_result=st, method=scope["method"])
+
+def _subpath(scope: Dict[str, Any]) -> str:
+    # Mount 之后 scope["path"] 仍是完整路径，root_path 为挂载点
+    path = scope["path"]
+    root = scope.get("root_path", "")
+    return path[len(root):] if root and path.startswith(root) else path
+
+def _not_modified_since(value: Optional[str], st: os.stat_result) -> bool:
+    if not value:
+        return False
+    try:
+        return int(parsedate_to_datetime(value).timestamp()) >= int(st.st_mtime)
+    except (TypeError, ValueError):
+        return False
+
+def precompress(directory: str) -> Dict[str, int]:
+    """构建期：为目录下可压缩文件生成旁路 .br/.gz。"""
+    files = written = 0
+    for root, _dirs, names in os.walk(directory):
+        for name in names:
+            if name.endswith((".br", ".gz")):
+                continue
+            full = os.path.join(root, name)
+            st = _stat(full)
+            if st is None or not _compressible(name, st.st_size):
+                continue
+            files += 1
+            written += write_sidecars(full)
+    return {"files": files, "written": written}
+
+if __name__ == "__main__":
+    print(precompress(sys.argv[1] if len(sys.argv) > 1 else "static"))
@@ -20,6 +20,27 @@ class Settings(BaseSettings):
     PG_DB: str = Field(default="minipost")
     PG_USER: str = Field(default="minipost")
     PG_PASSWORD: str = Field(default="changeme")  # 部署脚本会写强口令
+    # 可选异步引擎（热路径用）：asyncpg | psycopg（psycopg3）
+    DB_ASYNC: bool = Field(default=False)
+    PG_ASYNC_DRIVER: str = Field(default="asyncpg")
+    # 连接池（同步/异步引擎各一份，参数相同）
+    DB_POOL_SIZE: int = Field(default=5)
+    DB_MAX_OVERFLOW: int = Field(default=5)
+    DB_POOL_TIMEOUT: float = Field(default=30.0)
+    DB_POOL_RECYCLE: int = Field(default=-1)          # 秒，-1 不回收
+    DB_PRE_PING: str = Field(default="always")        # always | idle | never
+    DB_PRE_PING_IDLE_SECONDS: float = Field(default=30.0)
+    DB_STATEMENT_TIMEOUT_MS: int = Field(default=0)   # 0 不设置
+    DB_APPLICATION_NAME: str = Field(default="minipost")
+    # /metrics：开关；多 worker 聚合目录（留空 = 仅本进程）与落盘间隔
+    METRICS_ENABLED: bool = Field(default=True)
+    METRICS_DIR: str = Field(default="")
+    METRICS_FLUSH_SECONDS: float = Field(default=5.0)
+    # /internal/*、/metrics 运维端点允许的来源网段（逗号分隔）；默认仅本机回环。
+    # 8000 端口直接对外发布，私网段需按部署显式加入（如 Prometheus 所在网段），例：127.0.0.1/32,::1/128,10.0.5.0/24
+    INTERNAL_ALLOW: str = Field(default="127.0.0.1/32,::1/128")
+    # 受信反代网段（逗号分隔）：TCP 对端在其中时才按 X-Forwarded-For / X-Real-IP 解析真实客户端 IP（登录限流按 IP 计数）
+    TRUSTED_PROXIES: str = Field(default="127.0.0.1/32,::1/128")
 
     # 其它
     USE_REAL_NAV: bool = Field(default=False)
@@ -27,6 +48,59 @@ class Settings(BaseSettings):
     JWT_SECRET: str = Field(default="change-me-by-bootstrap")
     JWT_EXPIRES_MINUTES: int = Field(default=8 * 60)  # 8 小时
     ENVIRONMENT: str = Field(default="production")
+    # bcrypt 成本（2^N 轮）；用 python -m app.bootstrap calibrate-hash 按本机校验耗时标定
+    BCRYPT_ROUNDS: int = Field(default=12)
+    # 已验签 token 缓存（秒/条数；条目不超过 token 的 exp）
+    TOKEN_CACHE_TTL: float = Field(default=300.0)
+    TOKEN_CACHE_SIZE: int = Field(default=8192)
+    # Cookie 会话滑动续期：剩余不足 N 分钟时随正常请求续签（0 关闭）；自登录起最长会话小时数（0 不限）
+    JWT_REFRESH_WITHIN_MINUTES: int = Field(default=60)
+    JWT_MAX_SESSION_HOURS: int = Field(default=7 * 24)
+    # current_user 活跃用户缓存（秒/条数，TTL<=0 关闭）；token-claims 模式下热路径完全不查库
+    AUTH_CACHE_TTL: float = Field(default=30.0)
+    AUTH_CACHE_SIZE: int = Field(default=4096)
+    AUTH_TOKEN_CLAIMS: bool = Field(default=False)
+    # require_permissions 权限集合缓存（按 RBAC 代号失效；TTL 兜底跨进程写入）
+    PERM_CACHE_TTL: float = Field(default=60.0)
+    PERM_CACHE_SIZE: int = Field(default=4096)
+    # RBAC 批量导入：每批记录数（NDJSON 每批提交一次）兼单条 INSERT 的最大行数
+    RBAC_BULK_BATCH: int = Field(default=1000)
+    # 登录准入：每分钟次数与桶容量（<=0 关闭该维度）；并发校验上限（0 = 哈希池容量：线程数 + LOGIN_HASH_QUEUE）；
+    # 计数后端 memory | file（同机多 worker）| postgres（多机；表由 alembic 迁移 0002_login_bucket 创建）
+    LOGIN_IP_RATE: float = Field(default=30.0)
+    LOGIN_IP_BURST: int = Field(default=10)
+    LOGIN_USER_RATE: float = Field(default=10.0)
+    LOGIN_USER_BURST: int = Field(default=5)
+    LOGIN_VERIFY_CONCURRENCY: int = Field(default=0)
+    LOGIN_LIMIT_BACKEND: str = Field(default="memory")
+    # 登录口令校验专用线程池：线程数（0 = min(4, CPU)）与额外排队上限，超出即 503
+    LOGIN_HASH_WORKERS: int = Field(default=0)
+    LOGIN_HASH_QUEUE: int = Field(default=32)
+    # /static：stat 缓存间隔（秒）；无构建期 .br/.gz 时是否首个请求后台生成
+    STATIC_STAT_SECONDS: float = Field(default=10.0)
+    STATIC_COMPRESS_ON_DEMAND: bool = Field(default=True)
+    # SPA 壳层 index.html 变化检查间隔（秒）；<=0 只在首次加载
+    SPA_SHELL_CHECK_SECONDS: float = Field(default=2.0)
+    # 导航快照目录（多 worker 共享；多容器需挂同一卷）；留空则用系统临时目录下的 minipost/
+    NAV_CACHE_DIR: str = Field(default="")
+    # 跨 worker 导航同步：每隔 N 秒最多 stat 一次代号文件；<=0 关闭
+    NAV_SYNC_SECONDS: float = Field(default=2.0)
+    # 模块路由懒加载（全局默认；module.meta.yaml 的 lazy 优先，需同时声明 prefix）
+    MODULES_LAZY: bool = Field(default=False)
+    # /api/nav 按权限裁剪后的视图缓存：每个导航代最多保留的不同权限集合数
+    NAV_VIEW_CACHE_SIZE: int = Field(default=256)
+    # register 文件并行解析（仅 bootstrap refresh-nav 命令行重建；服务进程内始终串行）：
+    # 进程池大小（0 = 自动，min(CPU, 8)；1 = 串行）与启用进程池的最少待解析字节数
+    # 实测 CSafeLoader 串行约 1.3 MB/s，spawn 进程池固定开销约 0.4–0.6 s，约 4 MB 以上多核才划算
+    NAV_PARSE_WORKERS: int = Field(default=0)
+    NAV_PARSE_PARALLEL_MIN_BYTES: int = Field(default=4 * 1024 * 1024)
+    # 导航热重载监视器（开发/运维可选）：轮询间隔与防抖静默期（秒）
+    NAV_WATCH: bool = Field(default=False)
+    NAV_WATCH_INTERVAL: float = Field(default=1.0)
+    NAV_WATCH_DEBOUNCE: float = Field(default=0.5)
+    # /readyz 后台检查间隔与过期判定（秒）；探测本身只读内存结果
+    READY_CHECK_SECONDS: float = Field(default=5.0)
+    READY_STALE_SECONDS: float = Field(default=30.0)
 
     class Config:
         env_file = ".deploy.env"
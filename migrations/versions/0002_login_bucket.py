@@ -0,0 +1,32 @@
+"""login admission buckets (LOGIN_LIMIT_BACKEND=postgres)
+
+Revision ID: 0002_login_bucket
+Revises: 0001_init_rbac
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op  # type: ignore
+import sqlalchemy as sa  # type: ignore
+
+# revision identifiers, used by Alembic.
+revision = "0002_login_bucket"
+down_revision = "0001_init_rbac"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # UNLOGGED：计数可丢（崩溃后清空只是放宽一次限流），省 WAL；ts 索引供定期清理满桶行
+    op.execute(
+        """
+        CREATE UNLOGGED TABLE IF NOT EXISTS login_bucket (
+            key TEXT PRIMARY KEY,
+            tokens DOUBLE PRECISION NOT NULL,
+            ts DOUBLE PRECISION NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS ix_login_bucket_ts ON login_bucket (ts);
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS login_bucket;")
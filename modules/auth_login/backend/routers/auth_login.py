@@ -1,38 +1,30 @@
 # modules/auth_login/backend/routers/auth_login.py
 from __future__ import annotations
 
-import os
 from typing import Optional, Dict, Any
+import logging
 
-from fastapi import APIRouter, Request, Depends, HTTPException, status
+from fastapi import APIRouter, Request, HTTPException, status
 from fastapi.responses import HTMLResponse, JSONResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
 
-from app.db import get_db
-from app.security import create_access_token, pwd_context
+from app.db import async_session
+from app.deps import client_ip
+from app.security import create_access_token, set_access_cookie
+from app.services.hash_pool import HashPoolBusy, verify_and_update_async
+from app.services.login_guard import LoginThrottled, login_guard
+from app.services.spa_shell import spa_shell
 from modules.core.backend.models.rbac import User
 
+logger = logging.getLogger("minipost")
 router = APIRouter(tags=["auth"], include_in_schema=False)
 
 # ---------- SPA 登录页（保持不变）：GET /login ----------
-def _find_spa_index() -> Optional[str]:
-    candidates = [
-        "/app/static/assets/index.html",
-        "/app/static/index.html",
-        "static/assets/index.html",
-        "static/index.html",
-    ]
-    for p in candidates:
-        if os.path.exists(p):
-            return p
-    return None
-
 @router.get("/login")
 def login_page(request: Request):
-    spa = _find_spa_index()
-    if spa:
-        with open(spa, "r", encoding="utf-8") as f:
-            return HTMLResponse(content=f.read(), status_code=200)
+    shell = spa_shell.current()
+    if shell and not shell.dev_fallback:
+        return shell.response(request)
     return HTMLResponse(
         "<!doctype html><meta charset='utf-8'><title>Login</title>"
         "<p>前端构建产物缺失（static/assets/index.html 未找到）。"
@@ -65,14 +57,40 @@ async def _extract_credentials(request: Request) -> Dict[str, Any]:
 
     return {"username": (username or "").strip(), "password": (password or "").strip()}
 
+# ---------- 工具：查询登录用户（get_async_db 语义：异步引擎或线程池，不占事件循环） ----------
+async def _find_login_user(username: str) -> Optional[Any]:
+    stmt = (
+        select(User.id, User.username, User.password_hash)
+        .where(User.username == username, User.is_active == True)  # noqa: E712
+        .limit(1)
+    )
+    async with async_session() as db:
+        return (await db.execute(stmt)).first()
+
+# ---------- 工具：存量哈希成本与 BCRYPT_ROUNDS 不符时，登录成功顺带换成新哈希 ----------
+async def _rehash_user(user_id: int, old_hash: str, new_hash: str) -> None:
+    stmt = (
+        update(User)
+        .where(User.id == user_id, User.password_hash == old_hash)  # 期间改过密码则不覆盖
+        .values(password_hash=new_hash)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        async with async_session() as db:
+            await db.execute(stmt)
+            await db.commit()
+    except Exception as e:  # 重算失败不影响本次登录，下次再试
+        logger.warning("口令哈希成本更新失败 user_id=%s：%s", user_id, e)
+
 # ---------- 登录接口：/api/login（GET/POST 均可） ----------
 @router.api_route("/api/login", methods=["GET", "POST"])
-async def api_login(request: Request, db: Session = Depends(get_db)):
+async def api_login(request: Request):
     """
     统一的登录接口（不再依赖旧逻辑）：
     - 接受 Query / x-www-form-urlencoded / JSON 中的 username/password
     - 校验成功：签发 JWT，写入 access_token（HTTPOnly Cookie），返回 {ok: True, user: username}
-    - 失败：401 / 400
+    - 失败：401 / 400；准入超限 429、哈希池满 503（均带 Retry-After）
+    - DB 查询走 async_session（异步引擎或线程池）、bcrypt 走专用哈希池，事件循环不被阻塞
     """
     creds = await _extract_credentials(request)
     username = creds.get("username")
@@ -81,28 +99,37 @@ async def api_login(request: Request, db: Session = Depends(get_db)):
     if not username or not password:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="缺少用户名或密码")
 
-    user: Optional[User] = (
-        db.query(User)
-        .filter(User.username == username, User.is_active == True)  # noqa: E712
-        .first()
-    )
-    if not user or not pwd_context.verify(password, user.password_hash):
+    try:
+        # 准入：IP/用户名令牌桶在查库与 bcrypt 之前判定，并发闸包住口令校验
+        # IP 维度按真实客户端（受信反代后取转发头），避免同一反代/NAT 后的所有人共用一只桶
+        await login_guard.admit(client_ip(request), username)
+        user = await _find_login_user(username)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="用户名或密码错误")
+        async with login_guard.verifying():
+            ok, new_hash = await verify_and_update_async(password, user.password_hash)
+    except LoginThrottled as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="登录尝试过于频繁，请稍后重试",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except HashPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="登录繁忙，请稍后重试",
+            headers={"Retry-After": "1"},
+        )
+    if not ok:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="用户名或密码错误")
+    if new_hash:
+        await _rehash_user(user.id, user.password_hash, new_hash)
 
     # 生成 JWT，写入 HttpOnly Cookie（与 app.deps.current_user 依赖一致）
-    token = create_access_token(sub=user.username)
+    token = create_access_token(sub=user.username, claims={"uid": user.id})
 
     resp = JSONResponse({"ok": True, "user": user.username})
-    # Cookie 属性：HttpOnly，Lax，路径根；开发环境未强制 secure
-    resp.set_cookie(
-        key="access_token",
-        value=token,
-        httponly=True,
-        samesite="lax",
-        secure=False,
-        max_age=60 * 60 * 8,  # 与 Settings.JWT_EXPIRES_MINUTES 保持一致（8 小时）
-        path="/",
-    )
+    set_access_cookie(resp, token)
     return resp
 
 # ---------- 登出：清除 Cookie ----------
@@ -1,52 +1,139 @@
 # -*- coding: utf-8 -*-
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import select
+from typing import Any, AsyncIterator, Dict, List, Tuple
+import json
 
-from app.db import get_db
+from app.settings import settings
+
+from app.db import get_async_db
 from app.deps import require_permissions
 from modules.core.backend.schemas.rbac import (
     RoleCreate,
     PermissionCreate,
     GrantRolePermissions,
     BindUserRole,
+    BulkRBAC,
 )
-from modules.core.backend.models.rbac import User, Role, Permission
+from modules.core.backend.models.rbac import User, Role
 from modules.core.backend.services.rbac import (
     ensure_role,
     ensure_permission,
     grant_permissions_to_role,
     bind_user_role,
+    bulk_upsert,
 )
 
 router = APIRouter(prefix="/api/rbac", tags=["rbac"])
 
+# 路由走 get_async_db：DB_ASYNC 开启时为 AsyncSession，否则同步会话在线程池执行；
+# 写入逻辑复用同步 services（run_sync）
+
 @router.post("/roles", dependencies=[Depends(require_permissions(["rbac:manage"]))])
-def create_role(payload: RoleCreate, db: Session = Depends(get_db)):
-    r = ensure_role(db, payload.code, payload.name)
-    db.commit()
-    return {"ok": True, "role": {"code": r.code, "name": r.name}}
+async def create_role(payload: RoleCreate, db: Any = Depends(get_async_db)):
+    r = await db.run_sync(ensure_role, payload.code, payload.name)
+    role = {"code": r.code, "name": r.name}  # commit 前取值，避免 commit 后属性过期触发懒加载
+    await db.commit()
+    return {"ok": True, "role": role}
 
 @router.post("/perms", dependencies=[Depends(require_permissions(["rbac:manage"]))])
-def create_perm(payload: PermissionCreate, db: Session = Depends(get_db)):
-    p = ensure_permission(db, payload.key, payload.name)
-    db.commit()
-    return {"ok": True, "permission": {"key": p.key, "name": p.name}}
+async def create_perm(payload: PermissionCreate, db: Any = Depends(get_async_db)):
+    p = await db.run_sync(ensure_permission, payload.key, payload.name)
+    perm = {"key": p.key, "name": p.name}
+    await db.commit()
+    return {"ok": True, "permission": perm}
 
 @router.post("/grant", dependencies=[Depends(require_permissions(["rbac:manage"]))])
-def grant(payload: GrantRolePermissions, db: Session = Depends(get_db)):
-    role = db.query(Role).filter(Role.code == payload.role_code).first()
+async def grant(payload: GrantRolePermissions, db: Any = Depends(get_async_db)):
+    role = (await db.execute(select(Role).where(Role.code == payload.role_code))).scalars().first()
     if not role:
         raise HTTPException(status_code=404, detail="角色不存在")
-    grant_permissions_to_role(db, role, payload.permission_keys)
-    db.commit()
+    await db.run_sync(grant_permissions_to_role, role, payload.permission_keys)
+    await db.commit()
     return {"ok": True}
 
 @router.post("/bind", dependencies=[Depends(require_permissions(["rbac:manage"]))])
-def bind(payload: BindUserRole, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == payload.username).first()
-    role = db.query(Role).filter(Role.code == payload.role_code).first()
+async def bind(payload: BindUserRole, db: Any = Depends(get_async_db)):
+    user = (await db.execute(select(User).where(User.username == payload.username))).scalars().first()
+    role = (await db.execute(select(Role).where(Role.code == payload.role_code))).scalars().first()
     if not user or not role:
         raise HTTPException(status_code=404, detail="用户或角色不存在")
-    bind_user_role(db, user, role)
-    db.commit()
+    await db.run_sync(bind_user_role, user, role)
+    await db.commit()
     return {"ok": True}
+
+# ---- 批量导入 ----
+_NDJSON_TYPES = {
+    "role": ("roles", RoleCreate),
+    "permission": ("permissions", PermissionCreate),
+    "grant": ("grants", GrantRolePermissions),
+    "binding": ("bindings", BindUserRole),
+}
+_COUNT_KEYS = ("roles", "permissions", "grants", "bindings")
+
+def _totals(batches: List[Dict[str, Any]]) -> Dict[str, int]:
+    return {k: sum(b[k] for b in batches) for k in _COUNT_KEYS}
+
+@router.post("/bulk", dependencies=[Depends(require_permissions(["rbac:manage"]))])
+async def bulk(payload: BulkRBAC, db: Any = Depends(get_async_db)):
+    """一次事务导入（幂等）：{roles, permissions, grants, bindings}，已存在的跳过。"""
+    r = await db.run_sync(
+        bulk_upsert,
+        [x.model_dump() for x in payload.roles],
+        [x.model_dump() for x in payload.permissions],
+        [x.model_dump() for x in payload.grants],
+        [x.model_dump() for x in payload.bindings],
+    )
+    await db.commit()
+    return {"ok": True, "batches": [r], "totals": _totals([r])}
+
+def _parse_line(raw: bytes, lineno: int, batches: List[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+    try:
+        obj = json.loads(raw)
+        bucket, schema = _NDJSON_TYPES[obj.pop("type")]
+        return bucket, schema(**obj).model_dump()
+    except (ValueError, KeyError, TypeError, AttributeError, ValidationError) as e:
+        raise HTTPException(status_code=400, detail={"line": lineno, "error": str(e)[:300], "batches": batches})
+
+async def _lines(request: Request) -> AsyncIterator[bytes]:
+    buf = b""
+    async for chunk in request.stream():
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            yield line
+    if buf:
+        yield buf
+
+@router.post("/bulk/ndjson", dependencies=[Depends(require_permissions(["rbac:manage"]))])
+async def bulk_ndjson(request: Request, db: Any = Depends(get_async_db)):
+    """
+    流式导入：每行一个对象，type 为 role/permission/grant/binding，其余字段同单条接口。
+    每 RBAC_BULK_BATCH 行提交一批；某行非法时返回 400，此前的批次已提交（导入幂等，可整体重放）。
+    """
+    size = max(1, settings.RBAC_BULK_BATCH)
+    batches: List[Dict[str, Any]] = []
+    pending: Dict[str, List[Dict[str, Any]]] = {k: [] for k in _COUNT_KEYS}
+    count = lineno = 0
+
+    async def flush() -> None:
+        nonlocal pending, count
+        r = await db.run_sync(bulk_upsert, pending["roles"], pending["permissions"], pending["grants"], pending["bindings"])
+        await db.commit()
+        r["lines"] = count
+        batches.append(r)
+        pending, count = {k: [] for k in _COUNT_KEYS}, 0
+
+    async for raw in _lines(request):
+        lineno += 1
+        if not raw.strip():
+            continue
+        bucket, row = _parse_line(raw, lineno, batches)
+        pending[bucket].append(row)
+        count += 1
+        if count >= size:
+            await flush()
+    if count:
+        await flush()
+    return {"ok": True, "batches": batches, "totals": _totals(batches)}
@@ -17,3 +17,9 @@ class GrantRolePermissions(BaseModel):
 class BindUserRole(BaseModel):
     username: str
     role_code: str
+
+class BulkRBAC(BaseModel):
+    roles: List[RoleCreate] = []
+    permissions: List[PermissionCreate] = []
+    grants: List[GrantRolePermissions] = []
+    bindings: List[BindUserRole] = []
@@ -1,12 +1,68 @@
 # -*- coding: utf-8 -*-
+import sys, threading
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Mapping, Sequence, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
+
+from app.settings import settings
+from app.common.ttl_cache import TTLCache
 from modules.core.backend.models.rbac import User, Role, Permission, UserRole, RolePermission
 
+# ---- 权限解析缓存：user_id → (RBAC 代号, frozenset[权限 key]) ----
+# 角色/权限/授权/绑定变化时代号 +1，旧条目自然作废；TTL 兜底其它进程的写入
+_PERMS: TTLCache[Tuple[int, FrozenSet[str]]] = TTLCache(settings.PERM_CACHE_SIZE, settings.PERM_CACHE_TTL)
+_GEN_LOCK = threading.Lock()
+_RBAC_GENERATION = 0
+
+def bump_rbac_generation() -> int:
+    global _RBAC_GENERATION
+    with _GEN_LOCK:
+        _RBAC_GENERATION += 1
+        return _RBAC_GENERATION
+
+def _mark_dirty(db: Session) -> None:
+    # 写入时先 +1；提交后再 +1，防止提交前被并发请求按旧数据回填到新代号
+    db.info["rbac_dirty"] = True
+    bump_rbac_generation()
+
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session: Session) -> None:
+    if session.info.pop("rbac_dirty", False):
+        bump_rbac_generation()
+
+async def _load_user_permissions(user_id: int) -> FrozenSet[str]:
+    from app.db import async_session  # 仅未命中时才建会话
+    stmt = (
+        select(Permission.key)
+        .join(RolePermission, RolePermission.permission_id == Permission.id)
+        .join(UserRole, UserRole.role_id == RolePermission.role_id)
+        .where(UserRole.user_id == user_id)
+    )
+    async with async_session() as db:
+        rows = (await db.execute(stmt)).all()
+    return frozenset(sys.intern(r[0]) for r in rows)
+
+async def get_user_permissions(user_id: int) -> FrozenSet[str]:
+    """用户的有效权限集合（缓存命中时为纯内存操作）。"""
+    gen = _RBAC_GENERATION
+    hit = _PERMS.get(user_id)
+    if hit is not None and hit[0] == gen:
+        return hit[1]
+    keys = await _load_user_permissions(user_id)
+    _PERMS.set(user_id, (gen, keys))
+    return keys
+
+def permission_cache_info() -> Dict[str, int]:
+    return {"hits": _PERMS.hits, "misses": _PERMS.misses, "size": len(_PERMS), "generation": _RBAC_GENERATION}
+
 def ensure_role(db: Session, code: str, name: str) -> Role:
     r = db.query(Role).filter(Role.code == code).first()
     if r: return r
     r = Role(code=code, name=name)
     db.add(r); db.flush()
+    _mark_dirty(db)
     return r
 
 def ensure_permission(db: Session, key: str, name: str) -> Permission:
@@ -14,16 +70,98 @@ def ensure_permission(db: Session, key: str, name: str) -> Permission:
     if p: return p
     p = Permission(key=key, name=name)
     db.add(p); db.flush()
+    _mark_dirty(db)
     return p
 
-def grant_permissions_to_role(db: Session, role: Role, perm_keys):
-    perms = db.query(Permission).filter(Permission.key.in_(perm_keys)).all()
-    existing = {(rp.role_id, rp.permission_id) for rp in db.query(RolePermission).filter(RolePermission.role_id == role.id).all()}
-    for p in perms:
-        if (role.id, p.id) not in existing:
-            db.add(RolePermission(role_id=role.id, permission_id=p.id))
-
-def bind_user_role(db: Session, user: User, role: Role):
-    exists = db.query(UserRole).filter(UserRole.user_id == user.id, UserRole.role_id == role.id).first()
-    if not exists:
-        db.add(UserRole(user_id=user.id, role_id=role.id))
+def grant_permissions_to_role(db: Session, role: Role, perm_keys) -> int:
+    ids = db.execute(select(Permission.id).where(Permission.key.in_(list(perm_keys)))).scalars().all()
+    n = insert_ignore(db, RolePermission, [{"role_id": role.id, "permission_id": pid} for pid in ids])
+    if n:
+        _mark_dirty(db)
+    return n
+
+def bind_user_role(db: Session, user: User, role: Role) -> int:
+    n = insert_ignore(db, UserRole, [{"user_id": user.id, "role_id": role.id}])
+    if n:
+        _mark_dirty(db)
+    return n
+
+# ---- 批量：集合式 INSERT ... ON CONFLICT DO NOTHING（仅 PostgreSQL）----
+_CONFLICT_KEYS = {
+    Role: ("code",),
+    Permission: ("key",),
+    RolePermission: ("role_id", "permission_id"),
+    UserRole: ("user_id", "role_id"),
+}
+
+def _chunks(rows: List[dict], size: int) -> Iterator[List[dict]]:
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+def insert_ignore(db: Session, model: Any, rows: Iterable[dict]) -> int:
+    """按冲突键去重后多行插入，已存在的跳过；返回实际插入行数。"""
+    keys = _CONFLICT_KEYS[model]
+    uniq: Dict[Tuple[Any, ...], dict] = {}
+    for r in rows:
+        uniq.setdefault(tuple(r[k] for k in keys), r)
+    if not uniq:
+        return 0
+    dialect = db.get_bind().dialect.name
+    if dialect != "postgresql":  # 与 app.db 一致：仅支持 Postgres
+        raise RuntimeError(f"insert_ignore 仅支持 PostgreSQL（当前 {dialect}）")
+    total = 0
+    for chunk in _chunks(list(uniq.values()), max(1, settings.RBAC_BULK_BATCH)):
+        stmt = pg_insert(model).values(chunk).on_conflict_do_nothing(index_elements=list(keys))
+        total += max(db.execute(stmt).rowcount or 0, 0)
+    return total
+
+def _id_map(db: Session, col: Any, id_col: Any, values: Iterable[str]) -> Dict[str, int]:
+    values = sorted(set(values))
+    size = max(1, settings.RBAC_BULK_BATCH)
+    out: Dict[str, int] = {}
+    for i in range(0, len(values), size):
+        out.update(db.execute(select(col, id_col).where(col.in_(values[i:i + size]))).tuples().all())
+    return out
+
+def bulk_upsert(
+    db: Session,
+    roles: Sequence[Mapping[str, str]] = (),
+    permissions: Sequence[Mapping[str, str]] = (),
+    grants: Sequence[Mapping[str, Any]] = (),
+    bindings: Sequence[Mapping[str, str]] = (),
+) -> Dict[str, Any]:
+    """
+    一批角色/权限/授权/绑定的幂等导入（不提交，由调用方 commit）。
+    顺序：角色 → 权限 → 解析 id → 授权 → 绑定；同一批内可引用本批新建的角色/权限。
+    返回本批新插入的行数与无法解析的引用（不存在的用户/角色/权限）。
+    """
+    out: Dict[str, Any] = {
+        "roles": insert_ignore(db, Role, ({"code": r["code"], "name": r["name"]} for r in roles)),
+        "permissions": insert_ignore(db, Permission, ({"key": p["key"], "name": p["name"]} for p in permissions)),
+        "grants": 0,
+        "bindings": 0,
+        "missing": {"roles": [], "permissions": [], "users": []},
+    }
+    role_codes = [g["role_code"] for g in grants] + [b["role_code"] for b in bindings]
+    perm_keys = [k for g in grants for k in g["permission_keys"]]
+    usernames = [b["username"] for b in bindings]
+    role_ids = _id_map(db, Role.code, Role.id, role_codes) if role_codes else {}
+    perm_ids = _id_map(db, Permission.key, Permission.id, perm_keys) if perm_keys else {}
+    user_ids = _id_map(db, User.username, User.id, usernames) if usernames else {}
+    missing = out["missing"]
+    missing["roles"] = sorted(set(role_codes) - role_ids.keys())
+    missing["permissions"] = sorted(set(perm_keys) - perm_ids.keys())
+    missing["users"] = sorted(set(usernames) - user_ids.keys())
+
+    out["grants"] = insert_ignore(db, RolePermission, (
+        {"role_id": role_ids[g["role_code"]], "permission_id": perm_ids[k]}
+        for g in grants if g["role_code"] in role_ids
+        for k in g["permission_keys"] if k in perm_ids
+    ))
+    out["bindings"] = insert_ignore(db, UserRole, (
+        {"user_id": user_ids[b["username"]], "role_id": role_ids[b["role_code"]]}
+        for b in bindings if b["username"] in user_ids and b["role_code"] in role_ids
+    ))
+    if out["roles"] or out["permissions"] or out["grants"] or out["bindings"]:
+        _mark_dirty(db)
+    return out
@@ -12,20 +12,24 @@ compose_yml="$ROOT/deploy/docker-compose.yml"
 
 run_python(){
 python3 - <<'PY'
-from app.services.nav_loader import rebuild_nav
-nav = rebuild_nav(write_cache=True)
+from app.common.utils import refresh_nav_cache  # 重建 + 写快照 + 通知运行中的 worker
+nav = refresh_nav_cache()
+if not nav.get("ok"):
+    raise SystemExit("[reload_nav] 聚合失败：" + "; ".join(nav.get("errors") or []))
 s = nav.get("stats", {})
-print(f"[reload_nav] 已聚合：模块 {s.get('modules',0)} / 菜单 {s.get('menus',0)} / 页签 {s.get('tabs',0)}")
+print(f"[reload_nav] 已聚合：模块 {s.get('modules',0)} / 菜单 {s.get('menus',0)} / 页签 {s.get('tabs',0)} / 变更模块 {len(nav.get('changed') or [])}")
 PY
 }
 
 if command -v docker >/dev/null 2>&1 && command -v docker compose >/dev/null 2>&1; then
   if docker compose -f "$compose_yml" ps --services 2>/dev/null | grep -q '^web$'; then
     docker compose -f "$compose_yml" exec -T web python - <<'PY' || run_python
-from app.services.nav_loader import rebuild_nav
-nav = rebuild_nav(write_cache=True)
+from app.common.utils import refresh_nav_cache  # 重建 + 写快照 + 通知运行中的 worker
+nav = refresh_nav_cache()
+if not nav.get("ok"):
+    raise SystemExit("[reload_nav] 聚合失败：" + "; ".join(nav.get("errors") or []))
 s = nav.get("stats", {})
-print(f"[reload_nav] 已聚合：模块 {s.get('modules',0)} / 菜单 {s.get('menus',0)} / 页签 {s.get('tabs',0)}")
+print(f"[reload_nav] 已聚合：模块 {s.get('modules',0)} / 菜单 {s.get('menus',0)} / 页签 {s.get('tabs',0)} / 变更模块 {len(nav.get('changed') or [])}")
 PY
   else
     run_python
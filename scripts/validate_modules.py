@@ -4,6 +4,7 @@
 统一校验器（新 Schema）：
 - 不再逐项检查旧式 level/children 格式
 - 直接委托 app.services.nav_loader.rebuild_nav 做 Schema 校验与聚合
+- 注册文件指纹与已有快照一致时直接复用快照（快照只在校验通过后写入）
 - 成功时输出 "__SCHEMA_OK__"（兼容部署脚本 grep）
 """
 import os, sys, json, time, traceback
@@ -15,10 +16,10 @@ if BASE_DIR not in sys.path:
 def main() -> int:
     ok = True
     errors = []
-    nav = {"menu": {}, "tabs": {}, "generated_at": None, "hash": "0"*16, "stats": {"modules": 0, "menus": 0, "tabs": 0}}
+    nav = {"menu": {}, "tabs": {}, "routes": {}, "generated_at": None, "hash": "0"*16, "stats": {"modules": 0, "menus": 0, "tabs": 0}}
     try:
-        from app.services.nav_loader import rebuild_nav
-        nav = rebuild_nav(write_cache=True)
+        from app.services.nav_loader import load_nav
+        nav = load_nav(write_cache=True)
     except Exception as e:
         ok = False
         errors.append(str(e))
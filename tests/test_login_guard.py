@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""登录准入：受信反代后的客户端按转发头分桶。"""
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from app.deps import client_ip
+from app.services.login_guard import LoginGuard, LoginThrottled
+from app.settings import settings
+
+def _request(peer: str, headers: dict) -> Request:
+    return Request({
+        "type": "http", "method": "POST", "path": "/api/login", "query_string": b"",
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()],
+        "client": (peer, 50000),
+    })
+
+@pytest.fixture
+def proxy_settings(monkeypatch):
+    monkeypatch.setattr(settings, "TRUSTED_PROXIES", "127.0.0.1/32,172.16.0.0/12")
+    monkeypatch.setattr(settings, "LOGIN_IP_RATE", 1.0)
+    monkeypatch.setattr(settings, "LOGIN_IP_BURST", 2)
+    monkeypatch.setattr(settings, "LOGIN_USER_RATE", 0.0)
+    monkeypatch.setattr(settings, "LOGIN_LIMIT_BACKEND", "memory")
+
+def test_client_ip_resolution(proxy_settings):
+    assert client_ip(_request("172.17.0.1", {"X-Forwarded-For": "203.0.113.7"})) == "203.0.113.7"
+    # 最右侧的受信反代跳过，客户端自带的伪造头在左侧不被采用
+    assert client_ip(_request("127.0.0.1", {"X-Forwarded-For": "1.1.1.1, 198.51.100.2, 172.17.0.1"})) == "198.51.100.2"
+    assert client_ip(_request("127.0.0.1", {"X-Real-IP": "198.51.100.9"})) == "198.51.100.9"
+    # 不受信对端：转发头忽略
+    assert client_ip(_request("203.0.113.50", {"X-Forwarded-For": "10.0.0.1"})) == "203.0.113.50"
+
+def test_forwarded_clients_get_separate_buckets(proxy_settings):
+    guard = LoginGuard()
+    a = client_ip(_request("172.17.0.1", {"X-Forwarded-For": "203.0.113.7"}))
+    b = client_ip(_request("172.17.0.1", {"X-Forwarded-For": "203.0.113.8"}))
+
+    async def run() -> None:
+        for _ in range(settings.LOGIN_IP_BURST):
+            await guard.admit(a, "alice")
+        with pytest.raises(LoginThrottled):
+            await guard.admit(a, "alice")
+        # 同一反代后的另一个客户端不受影响
+        for _ in range(settings.LOGIN_IP_BURST):
+            await guard.admit(b, "bob")
+
+    asyncio.run(run())
+
+def test_sqlite_buckets_prune_refilled_rows(proxy_settings, tmp_path):
+    from app.services.login_guard import SqliteBuckets
+    buckets = SqliteBuckets(str(tmp_path / "buckets.sqlite3"))
+    conn = buckets._conn()
+    conn.execute("INSERT INTO login_bucket(key, tokens, ts) VALUES ('user:stale', 0, 0)")
+    assert buckets.take("ip:203.0.113.7", 1.0, 2) == 0.0
+    keys = {k for (k,) in conn.execute("SELECT key FROM login_bucket")}
+    # 早已回满的行被清理，刚写入的保留
+    assert keys == {"ip:203.0.113.7"}